@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class JubanshopConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'JubanShop'
+
+    def ready(self):
+        from . import jobs  # noqa: F401  Registers the Juban export archives
+        from . import signals  # noqa: F401
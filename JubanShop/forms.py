@@ -2,6 +2,8 @@ from django import forms
 from django.core.exceptions import ValidationError
 
 from JubanShop.models import JubanItemInventory, JubanInventoryHistory, JubanStockInHistory
+from po.forms import ProductNameField, ProductNameSelect
+from po.shops import JUBAN_SHOP
 
 
 class JubanUploadFileForm(forms.Form):
@@ -190,9 +192,9 @@ class JubanItemInventoryBulkForm(forms.ModelForm):
 
 
 class JubanStockInHistoryForm(forms.ModelForm):
-    particulars = forms.ChoiceField(
-        choices=[(p, p) for p in JubanItemInventory.objects.values_list('po_product_name', flat=True).distinct()],
-        widget=forms.Select(attrs={'class': 'form-control select2', 'id': 'id_particulars'}),
+    particulars = ProductNameField(
+        JUBAN_SHOP,
+        widget=ProductNameSelect(attrs={'class': 'form-control select2', 'id': 'id_particulars'}),
         required=True,
         label='Particulars'
     )
@@ -236,8 +238,3 @@ class JubanStockInHistoryForm(forms.ModelForm):
             'payment_details': forms.Select(attrs={'class': 'form-control'}),
             'remarks2': forms.Select(attrs={'class': 'form-control'})
         }
-
-    def __init__(self, *args, **kwargs):
-        super(JubanStockInHistoryForm, self).__init__(*args, **kwargs)
-        # Dynamically update the queryset for 'particulars'
-        self.fields['particulars'].queryset = JubanItemInventory.objects.values_list('po_product_name', flat=True).distinct()
\ No newline at end of file
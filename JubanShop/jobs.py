@@ -0,0 +1,15 @@
+from po.exports import SITE_FOLDER_SHEET, CLIENT_FOLDER_SHEET
+from po.jobs import FolderArchive, register_archive
+from .models import JubanInventoryHistory, JubanSiteInventoryFolder, JubanClientInventoryFolder
+
+register_archive(FolderArchive(
+    'juban_site_folders', 'juban_site_inventory_folders.zip', JubanSiteInventoryFolder.objects.all,
+    lambda folder: (f'SiteInventoryRecords_{folder.name}.xlsx', SITE_FOLDER_SHEET,
+                    JubanInventoryHistory.objects.filter(site_inventory_folder=folder))
+))
+
+register_archive(FolderArchive(
+    'juban_client_folders', 'juban_client_inventory_folders.zip', JubanClientInventoryFolder.objects.all,
+    lambda folder: (f'JubanClientInventory_{folder.name}.xlsx', CLIENT_FOLDER_SHEET,
+                    JubanInventoryHistory.objects.filter(client_inventory_folder=folder))
+))
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JubanShop', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jubanitemcodelist',
+            name='item_code',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='jubanitemcodelist',
+            name='unit',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='jubaninventoryhistory',
+            index=models.Index(fields=['-date', '-id'], name='juban_history_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jubanitemcodelist',
+            index=models.Index(fields=['po_product_name', 'item_code'], name='juban_itemcode_name_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jubaniteminventory',
+            index=models.Index(fields=['item_code', 'supplier'], name='juban_item_code_supplier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jubaniteminventory',
+            index=models.Index(fields=['po_product_name'], name='juban_item_product_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jubanstockinhistory',
+            index=models.Index(fields=['-date', '-id'], name='juban_stockin_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='jubanstockinhistory',
+            index=models.Index(fields=['supplier', 'supplier_folder'], name='juban_stockin_supplier_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:02
+
+import po.rollups
+from django.db import migrations, models
+
+
+def fill_rollups(apps, schema_editor):
+    po.rollups.rebuild_rollups(apps.get_model('JubanShop', 'JubanInventoryHistory'), using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JubanShop', '0003_cart_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jubanclientinventoryfolder',
+            name='last_activity',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jubanclientinventoryfolder',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jubanclientinventoryfolder',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.AddField(
+            model_name='jubansiteinventoryfolder',
+            name='last_activity',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jubansiteinventoryfolder',
+            name='row_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jubansiteinventoryfolder',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=17),
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:21
+
+from django.conf import settings
+import po.carts
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    po.carts.merge_duplicate_lines(apps.get_model('JubanShop', 'JubanCart'), using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JubanShop', '0004_folder_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='jubancart',
+            constraint=models.UniqueConstraint(fields=('cart_key', 'item'), name='juban_cart_key_item_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='jubancart',
+            name='juban_cart_key_item_idx',
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
@@ -8,12 +9,21 @@ class JubanItemCodeList(models.Model):
     po_product_name = models.CharField(max_length=100)
     unit = models.CharField(max_length=50, null=True, blank=True)  # Allow null and blank
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['po_product_name', 'item_code'], name='juban_itemcode_name_code_idx'),  # Catalog sync looks names up
+        ]
+
     def __str__(self):
         return f"{self.item_code} - {self.po_product_name} - {self.unit}"
 
 
 class JubanSiteInventoryFolder(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    # Rollups of the folder's InventoryHistory rows, kept current by po/rollups.py
+    row_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    last_activity = models.DateField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -21,6 +31,10 @@ class JubanSiteInventoryFolder(models.Model):
 
 class JubanClientInventoryFolder(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    # Rollups of the folder's InventoryHistory rows, kept current by po/rollups.py
+    row_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    last_activity = models.DateField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -85,6 +99,12 @@ class JubanStockInHistory(models.Model):
     remarks2 = models.CharField(max_length=20, choices=REMARKS2_CHOICES, verbose_name='Remarks2',null=True, blank=True)
     supplier_folder = models.ForeignKey(JubanInventorySupplierFolder, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='juban_stockin_date_idx'),  # Stock-in history, newest first
+            models.Index(fields=['supplier', 'supplier_folder'], name='juban_stockin_supplier_idx'),  # Filing stock-ins into supplier folders
+        ]
+
     @property
     def remarks2_badge(self):
         # Define a dictionary that maps remarks2 choices to corresponding background colors
@@ -140,6 +160,12 @@ class JubanItemInventory(models.Model):
     invoice_type = models.CharField(max_length=10, choices=INVOICE_CHOICES, verbose_name='Invoice#', null=True, blank=True)
     invoice_no = models.CharField(max_length=255, verbose_name='Invoice No.', null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['item_code', 'supplier'], name='juban_item_code_supplier_idx'),  # Stock-in matching
+            models.Index(fields=['po_product_name'], name='juban_item_product_name_idx'),  # Name lookups and the inventory table ordering
+        ]
+
 
 class JubanInventoryHistory(models.Model):
     SITE_OR_CLIENT_CHOICES = (
@@ -182,10 +208,24 @@ class JubanInventoryHistory(models.Model):
     site_or_client_choice = models.CharField(max_length=10, choices=SITE_OR_CLIENT_CHOICES, blank=True, null=True)
     remarks = models.TextField(blank=True, null=True, verbose_name='Remarks')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='juban_history_date_idx'),  # Transaction history, newest first
+        ]
+
+
 
 class JubanCart(models.Model):
     item = models.ForeignKey(JubanItemInventory, on_delete=models.CASCADE)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cart_key = models.CharField(max_length=32, blank=True, default='')  # The session's cart, see po/carts.py
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # One line per item in a cart; concurrent adds merge into it (po/carts.py)
+            models.UniqueConstraint(fields=['cart_key', 'item'], name='juban_cart_key_item_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.item} - {self.quantity}"
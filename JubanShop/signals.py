@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from po.catalog import catalog_changed, sync_item_codes
+from po.rollups import history_deleted, history_saved, history_saving
+from po.shops import JUBAN_SHOP
+from .models import JubanInventoryHistory, JubanItemInventory
+
+
+@receiver(post_save, sender=JubanItemInventory)
+def sync_item_code_list(sender, instance, **kwargs):
+    # Keeps the item code list in step with inventory writes (bulk writes call sync_item_codes themselves)
+    sync_item_codes(JUBAN_SHOP, [(instance.item_code, instance.po_product_name, instance.unit)])
+
+
+@receiver(post_save, sender=JubanItemInventory)
+@receiver(post_delete, sender=JubanItemInventory)
+def inventory_catalog_changed(sender, instance, **kwargs):
+    # The cached product names and catalog feed (po/catalog.py) are rebuilt on the next read
+    catalog_changed(JUBAN_SHOP, [instance.pk])
+
+
+# Folder totals (po/rollups.py) follow every saved or deleted history row
+
+@receiver(pre_save, sender=JubanInventoryHistory)
+def remember_history_folders(sender, instance, using, update_fields=None, **kwargs):
+    history_saving(sender, instance, using, update_fields)
+
+
+@receiver(post_save, sender=JubanInventoryHistory)
+def update_folder_rollups(sender, instance, using, update_fields=None, **kwargs):
+    history_saved(sender, instance, using, update_fields)
+
+
+@receiver(post_delete, sender=JubanInventoryHistory)
+def remove_from_folder_rollups(sender, instance, using, **kwargs):
+    history_deleted(sender, instance, using)
@@ -1,3 +1,22 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from po.imports import STOCK_IN_COLUMNS
+from po.models import ItemInventory, StockInHistory, InventorySupplierFolder
+from po.tests import xlsx_upload
+from .models import JubanItemInventory, JubanStockInHistory, JubanInventorySupplierFolder
+
+
+class JubanStockInUploadTests(TestCase):
+    def test_upload_goes_to_the_juban_models(self):
+        rows = [{'ITEM CODE': 'C-1', 'SUPPLIER': 'Acme', 'PARTICULAR': 'Cement', 'UNIT': 'bag', 'QUANTITY IN': 3}]
+        response = self.client.post(reverse('juban_upload_stock_in_file'),
+                                    {'file': xlsx_upload(STOCK_IN_COLUMNS, rows)})
+
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(JubanItemInventory.objects.get(po_product_name='Cement').stock, 3)
+        self.assertEqual(JubanStockInHistory.objects.get().supplier_folder,
+                         JubanInventorySupplierFolder.objects.get(name='Acme'))
+        self.assertFalse(ItemInventory.objects.exists())
+        self.assertFalse(StockInHistory.objects.exists())
+        self.assertFalse(InventorySupplierFolder.objects.exists())
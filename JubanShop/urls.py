@@ -37,6 +37,7 @@ urlpatterns = [
     path('juban/client-inventory-folder/<int:folder_id>/edit-remarks/<int:record_id>/',
          views.juban_edit_inventory_history_remarks, name='juban_edit_inventory_history_remarks'),
     path('juban/bulk-edit-inventory/', views.juban_bulk_edit_inventory, name='juban_bulk_edit_inventory'),
+    path('juban/bulk-edit-inventory/items/', views.juban_bulk_inventory_items, name='juban_bulk_inventory_items'),
     path('juban/remove-cart-item/<int:cart_item_id>/', views.juban_remove_cart_item, name='juban_remove_cart_item'),
     path('juban/stock-in/create/', views.juban_stock_in_create, name='juban_stock_in_create'),
     path('juban/inventory-supplier-folder/list/', views.juban_inventory_supplier_list_folders,
@@ -46,7 +47,9 @@ urlpatterns = [
     path('juban/inventory-supplier-folder/export/<int:folder_id>/', views.juban_export_inventory_supplier_contents,
          name='juban_export_inventory_supplier_contents'),
     path('juban/get-item-details/', views.juban_get_item_details, name='juban_get_item_details'),
+    path('juban/get-item-details/batch/', views.juban_get_item_details_batch, name='juban_get_item_details_batch'),
     path('juban/get-item-inventory/', views.juban_get_item_inventory, name='juban_get_item_inventory'),
+    path('juban/product-typeahead/', views.juban_product_typeahead, name='juban_product_typeahead'),
     path('juban/stock-in-transaction-history/', views.juban_stock_in_transaction_history,
          name='juban_stock_in_transaction_history'),
     path('juban/stock-in/upload/', views.juban_upload_stock_in_file, name='juban_upload_stock_in_file'),
@@ -1,20 +1,27 @@
 import json
-import zipfile
-from datetime import datetime
-from decimal import Decimal
-from io import BytesIO
-
-import openpyxl
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from django.db.models import Q, Sum
+
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Q
 from django.http import JsonResponse, HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from openpyxl.styles import PatternFill, Font
-from openpyxl.workbook import Workbook
 
+from po.exports import xlsx_response, INVENTORY_SHEET, TRANSACTION_HISTORY_SHEET, SITE_FOLDER_SHEET, \
+    CLIENT_FOLDER_SHEET, STOCK_IN_RECORDS_SHEET, STOCK_IN_HISTORY_SHEET
+from po.imports import import_stock_in, stock_in_message
+from po.jobs import start_export_job
+from po.inventory import inventory_items, matching_item, name_taken, stock_ins, stock_outs, supplier_stock_ins
+from po.catalog import catalog_response, item_details_response, lookup_item_details, search_product_names
+from po.carts import add_to_cart, cart_changed, cart_key, posted_quantities, user_cart
+from po.delivery import finalize_cart
+from po.folders import assign_folder
+from po.ledger import merge_into, receive, save_details, set_quantities
+from po.pagination import paginate, HISTORY_KEYS
+from po.pickers import inventory_picker, inventory_row, picker_page, picker_response
+from po.shops import JUBAN_SHOP
 from .forms import JubanItemInventoryListForm, JubanItemInventoryQuantityForm, JubanEditRemarksForm, \
     JubanItemInventoryBulkForm, JubanStockInHistoryForm, JubanUploadFileForm
 from .models import JubanItemInventory, JubanItemCodeList, JubanSiteInventoryFolder, JubanInventoryHistory, \
@@ -27,7 +34,7 @@ def juban_inventory_form(request):
         po_product_name = request.POST.get('po_product_name')
 
         # Check if the po_product_name already exists in the Juban database
-        if JubanItemInventory.objects.filter(po_product_name=po_product_name).exists():
+        if name_taken(JUBAN_SHOP, po_product_name):
             messages.error(request, 'PO Product Name already exists. Please use a different name.')
         elif form.is_valid():
             # Save the form to create the item
@@ -55,33 +62,8 @@ def juban_inventory_form(request):
 def juban_inventory_table(request):
     query = request.GET.get('q')
 
-    # Fetch all inventory items, ordered by 'po_product_name'
-    inventory_items = JubanItemInventory.objects.all().order_by('po_product_name')
-
-    # If there is a search query, filter the results
-    if query:
-        inventory_items = inventory_items.filter(
-            Q(item_code__icontains=query) |
-            Q(supplier__icontains=query) |
-            Q(po_product_name__icontains=query) |
-            Q(unit__icontains=query) |
-            Q(quantity_in__icontains=query) |
-            Q(quantity_out__icontains=query) |
-            Q(stock__icontains=query)
-        )
-
-    # Ensure the ItemCodeList gets updated if necessary
-    for item in inventory_items:
-        if not JubanItemCodeList.objects.filter(item_code=item.item_code,
-                                                po_product_name=item.po_product_name).exists():
-            JubanItemCodeList.objects.create(
-                item_code=item.item_code,
-                po_product_name=item.po_product_name,
-                unit=item.unit
-            )
-
-    # Paginate the results, displaying 100 items per page
-    paginator = Paginator(inventory_items, 100)
+    # All inventory items by name, narrowed by the search query (po/inventory.py), 100 per page
+    paginator = Paginator(inventory_items(JUBAN_SHOP, query), 100)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
@@ -112,24 +94,17 @@ def juban_inventory_edit(request, id):
             updated_item = form.save(commit=False)
 
             # Check if an existing record with the same supplier and po_product_name already exists
-            existing_inventory_item = JubanItemInventory.objects.filter(
-                supplier=updated_item.supplier,
-                po_product_name=updated_item.po_product_name
-            ).exclude(id=id).first()
+            existing_inventory_item = matching_item(JUBAN_SHOP, updated_item)
 
             if existing_inventory_item:
-                # If a matching record exists, update its quantities and stock
-                existing_inventory_item.quantity_in += updated_item.quantity_in
-                existing_inventory_item.quantity_out += updated_item.quantity_out
-                existing_inventory_item.stock = existing_inventory_item.quantity_in - existing_inventory_item.quantity_out
-                existing_inventory_item.save()
-
-                # Optionally, delete the current record or return success message
-                inventory_item.delete()  # Remove the current item as it merges with the existing one.
+                # If a matching record exists, add the quantities to it and remove the current item
+                merge_into(JUBAN_SHOP, inventory_item.id, existing_inventory_item.id,
+                           updated_item.quantity_in, updated_item.quantity_out)
             else:
-                # If no matching record, update the current inventory item
-                updated_item.stock = updated_item.quantity_in - updated_item.quantity_out
-                updated_item.save()
+                # If no matching record, update the current inventory item; quantities go through the ledger
+                with transaction.atomic():
+                    save_details(updated_item)
+                    set_quantities(JUBAN_SHOP, inventory_item.id, updated_item.quantity_in, updated_item.quantity_out)
 
             return JsonResponse({'status': 'success'})
         else:
@@ -159,85 +134,10 @@ def juban_item_code_list(request):
 def juban_export_inventory_to_excel(request):
     query = request.GET.get('q')  # Search query parameter
 
-    # Start with all inventory items
-    inventory_list = JubanItemInventory.objects.all()
+    # The inventory table's items and search (po/inventory.py)
+    inventory_list = inventory_items(JUBAN_SHOP, query)
 
-    # Apply search filter
-    if query:
-        inventory_list = inventory_list.filter(
-            Q(item_code__icontains=query) |
-            Q(supplier__icontains=query) |
-            Q(po_product_name__icontains=query) |
-            Q(new_product_name__icontains=query) |
-            Q(unit__icontains=query) |
-            Q(quantity_in__icontains=query) |
-            Q(quantity_out__icontains=query) |
-            Q(stock__icontains=query) |
-            Q(price__icontains=query) |
-            Q(total_amount__icontains=query)
-        )
-
-    # Create a workbook and a sheet
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'Inventory'
-
-    header_font = Font(bold=True)
-    blue_fill = PatternFill(start_color='00B0F0', end_color='00B0F0', fill_type='solid')
-    currency_format = '#,##0.00'
-
-    # Define the headers
-    headers = [
-        'Item Code', 'Supplier', 'Particular', 'New Product Name', 'Unit',
-        'Quantity In', 'Quantity Out', 'Stock', 'Price', 'Total Amount'
-    ]
-    sheet.append(headers)
-
-    for cell in sheet[1]:
-        cell.font = header_font
-        cell.fill = blue_fill
-
-    # Populate the sheet with data
-    for item in inventory_list:
-        sheet.append([
-            item.item_code, item.supplier, item.po_product_name, item.new_product_name,
-            item.unit, item.quantity_in, item.quantity_out, item.stock,
-            item.price, item.total_amount
-        ])
-
-    for cell in sheet['I']:  # Assuming price is in column I (index 9)
-        if cell.row > 1:  # Skip header row
-            cell.number_format = currency_format
-
-    for cell in sheet['J']:  # Assuming total_amount is in column J (index 10)
-        if cell.row > 1:  # Skip header row
-            cell.number_format = currency_format
-
-    # Adjust column widths
-    for column in sheet.columns:
-        max_length = 0
-        column_letter = column[0].column_letter  # Get the column name (e.g., 'A', 'B', etc.)
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(cell.value)
-            except:
-                pass
-        adjusted_width = (max_length + 2)  # Add extra space for better visibility
-        sheet.column_dimensions[column_letter].width = adjusted_width
-
-    # Create an in-memory buffer
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-
-    # Set the response to return the Excel file
-    response = HttpResponse(
-        buffer,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=Juban_Inventory.xlsx'
-    return response
+    return xlsx_response('Juban_Inventory.xlsx', INVENTORY_SHEET, inventory_list)
 
 
 def juban_export_site_folder_contents(request, folder_id):
@@ -246,166 +146,16 @@ def juban_export_site_folder_contents(request, folder_id):
         folder = JubanSiteInventoryFolder.objects.get(id=folder_id)
         transactions = JubanInventoryHistory.objects.filter(site_inventory_folder=folder)
 
-        # Create a workbook and a sheet
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = 'Site Inventory Records'
-
-        # Define header styles
-        header_font = Font(bold=True)
-        blue_fill = PatternFill(start_color='00B0F0', end_color='00B0F0', fill_type='solid')
-        currency_format = '#,##0.00'
-
-        # Define the headers
-        headers = [
-            'Transaction ID', 'Site Delivered', 'Date', 'Item', 'Quantity In', 'Quantity Out',
-            'Price', 'Total Amount', 'Delivery Ref', 'Delivery No.'
-        ]
-        sheet.append(headers)
-
-        for cell in sheet[1]:
-            cell.font = header_font
-            cell.fill = blue_fill
-            cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-        # Populate the sheet with data
-        for transaction in transactions:
-            sheet.append([
-                transaction.id,
-                transaction.site_delivered,
-                transaction.date.strftime('%Y-%m-%d') if transaction.date else 'N/A',
-                str(transaction.item),  # Convert JubanItemInventory instance to string
-                transaction.quantity_in,
-                transaction.quantity_out,
-                transaction.price,
-                transaction.total_amount,
-                transaction.delivery_ref,
-                transaction.delivery_no,
-            ])
-
-        # Apply currency format to price and total_amount columns
-        for cell in sheet['G']:  # Assuming price is in column G (index 7)
-            if cell.row > 1:  # Skip header row
-                cell.number_format = currency_format
-
-        for cell in sheet['H']:  # Assuming total_amount is in column H (index 8)
-            if cell.row > 1:  # Skip header row
-                cell.number_format = currency_format
-
-        # Adjust column widths
-        for column in sheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter  # Get the column name (e.g., 'A', 'B', etc.)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = (max_length + 2)  # Add extra space for better visibility
-            sheet.column_dimensions[column_letter].width = adjusted_width
-
-        # Create an in-memory buffer
-        buffer = BytesIO()
-        workbook.save(buffer)
-        buffer.seek(0)
-
-        # Set the response to return the Excel file
-        response = HttpResponse(
-            buffer,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename=Juban_SiteInventory_{folder.name}.xlsx'
-        return response
+        return xlsx_response(f'Juban_SiteInventory_{folder.name}.xlsx', SITE_FOLDER_SHEET, transactions)
 
     except JubanSiteInventoryFolder.DoesNotExist:
         return HttpResponse("Site Inventory Folder not found", status=404)
 
 
 def juban_export_all_site_inventory_folders(request):
-    # Create an in-memory buffer to hold the zip file
-    buffer = BytesIO()
-
-    # Create a zip file in the buffer
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Iterate through each site inventory folder
-        for folder in JubanSiteInventoryFolder.objects.all():
-            # Get transactions for the folder
-            transactions = JubanInventoryHistory.objects.filter(site_inventory_folder=folder)
-
-            # Create a workbook and a sheet
-            workbook = Workbook()
-            sheet = workbook.active
-            sheet.title = 'Site Inventory Records'
-
-            # Define header styles
-            header_font = Font(bold=True)
-            blue_fill = PatternFill(start_color='00B0F0', end_color='00B0F0', fill_type='solid')
-            currency_format = '#,##0.00'
-
-            # Define the headers
-            headers = [
-                'Transaction ID', 'Site Delivered', 'Date', 'Item', 'Quantity In', 'Quantity Out',
-                'Price', 'Total Amount', 'Delivery Ref', 'Delivery No.'
-            ]
-            sheet.append(headers)
-
-            for cell in sheet[1]:
-                cell.font = header_font
-                cell.fill = blue_fill
-                cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-            # Populate the sheet with data
-            for transaction in transactions:
-                sheet.append([
-                    transaction.id,
-                    transaction.site_delivered,
-                    transaction.date.strftime('%Y-%m-%d') if transaction.date else 'N/A',
-                    str(transaction.item),  # Convert JubanItemInventory instance to string
-                    transaction.quantity_in,
-                    transaction.quantity_out,
-                    transaction.price,
-                    transaction.total_amount,
-                    transaction.delivery_ref,
-                    transaction.delivery_no,
-                ])
-
-            # Apply currency format to price and total_amount columns
-            for cell in sheet['G']:  # Assuming price is in column G (index 7)
-                if cell.row > 1:  # Skip header row
-                    cell.number_format = currency_format
-
-            for cell in sheet['H']:  # Assuming total_amount is in column H (index 8)
-                if cell.row > 1:  # Skip header row
-                    cell.number_format = currency_format
-
-            # Adjust column widths
-            for column in sheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                sheet.column_dimensions[column_letter].width = adjusted_width
-
-            # Save the workbook to a bytes buffer
-            excel_buffer = BytesIO()
-            workbook.save(excel_buffer)
-            excel_buffer.seek(0)
-
-            # Add the workbook to the zip file
-            zf.writestr(f'SiteInventoryRecords_{folder.name}.xlsx', excel_buffer.getvalue())
-
-    buffer.seek(0)
-
-    # Set the response to return the zip file
-    response = HttpResponse(buffer, content_type='application/zip')
-    response['Content-Disposition'] = 'attachment; filename=juban_site_inventory_folders.zip'
-    return response
+    if request.method == 'POST':
+        return start_export_job('juban_site_folders')
+    return JsonResponse({'success': False, 'error': 'Invalid request method.'})
 
 
 def juban_export_client_folder_contents(request, folder_id):
@@ -414,454 +164,49 @@ def juban_export_client_folder_contents(request, folder_id):
         folder = JubanClientInventoryFolder.objects.get(id=folder_id)
         transactions = JubanInventoryHistory.objects.filter(client_inventory_folder=folder)
 
-        # Create a workbook and a sheet
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = 'Client Inventory Records'
-
-        # Define header styles
-        header_font = Font(bold=True)
-        gold_fill = PatternFill(start_color='F59B00', end_color='F59B00', fill_type='solid')
-        currency_format = '#,##0.00'
-
-        # Define the headers
-        headers = [
-            'Transaction ID', 'Client', 'Date', 'Item', 'Quantity In', 'Quantity Out',
-            'Price', 'Total Amount', 'Delivery Ref', 'Delivery No.', 'Invoice Type', 'Invoice#'
-        ]
-        sheet.append(headers)
-
-        for cell in sheet[1]:
-            cell.font = header_font
-            cell.fill = gold_fill
-            cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-        # Populate the sheet with data
-        for transaction in transactions:
-            sheet.append([
-                transaction.id,
-                transaction.client if transaction.client else 'N/A',
-                transaction.date.strftime('%Y-%m-%d') if transaction.date else 'N/A',
-                str(transaction.item),
-                transaction.quantity_in,
-                transaction.quantity_out,
-                transaction.price,
-                transaction.total_amount,
-                transaction.delivery_ref,
-                transaction.delivery_no,
-                transaction.invoice_type,
-                transaction.invoice_no,
-            ])
-
-        # Apply currency format to price and total_amount columns
-        for cell in sheet['G']:
-            if cell.row > 1:
-                cell.number_format = currency_format
-
-        for cell in sheet['H']:
-            if cell.row > 1:
-                cell.number_format = currency_format
-
-        # Adjust column widths
-        for column in sheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-                adjusted_width = (max_length + 2)
-                sheet.column_dimensions[column_letter].width = adjusted_width
-
-        # Create an in-memory buffer
-        buffer = BytesIO()
-        workbook.save(buffer)
-        buffer.seek(0)
-
-        # Set the response to return the Excel file
-        response = HttpResponse(
-            buffer,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename=JubanClientInventory_{folder.name}.xlsx'
-        return response
+        return xlsx_response(f'JubanClientInventory_{folder.name}.xlsx', CLIENT_FOLDER_SHEET, transactions)
 
     except JubanClientInventoryFolder.DoesNotExist:
         return HttpResponse("Client Inventory Folder not found", status=404)
 
 
 def juban_export_all_client_folders(request):
-    # Create an in-memory buffer to hold the zip file
-    buffer = BytesIO()
-
-    # Create a zip file in the buffer
-    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Iterate through each client folder
-        for folder in JubanClientInventoryFolder.objects.all():
-            # Get inventory records for the folder
-            transactions = JubanInventoryHistory.objects.filter(client_inventory_folder=folder)
-
-            # Create a workbook and a sheet
-            workbook = Workbook()
-            sheet = workbook.active
-            sheet.title = 'Client Inventory Records'
-
-            # Define header styles
-            header_font = Font(bold=True)
-            gold_fill = PatternFill(start_color='F59B00', end_color='F59B00', fill_type='solid')
-            currency_format = '#,##0.00'
-
-            # Define the headers
-            headers = [
-                'Transaction ID', 'Client', 'Date', 'Item', 'Quantity In', 'Quantity Out',
-                'Price', 'Total Amount', 'Delivery Ref', 'Delivery No.', 'Invoice Type', 'Invoice#'
-            ]
-            sheet.append(headers)
-
-            for cell in sheet[1]:
-                cell.font = header_font
-                cell.fill = gold_fill
-                cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-            # Populate the sheet with data
-            for transaction in transactions:
-                sheet.append([
-                    transaction.id,
-                    transaction.client if transaction.client else 'N/A',
-                    transaction.date.strftime('%Y-%m-%d') if transaction.date else 'N/A',
-                    str(transaction.item),
-                    transaction.quantity_in,
-                    transaction.quantity_out,
-                    transaction.price,
-                    transaction.total_amount,
-                    transaction.delivery_ref,
-                    transaction.delivery_no,
-                    transaction.invoice_type,
-                    transaction.invoice_no,
-                ])
-
-            # Apply currency format to price and total_amount columns
-            for cell in sheet['G']:
-                if cell.row > 1:
-                    cell.number_format = currency_format
-
-            for cell in sheet['H']:
-                if cell.row > 1:
-                    cell.number_format = currency_format
-
-            # Adjust column widths
-            for column in sheet.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(cell.value)
-                    except:
-                        pass
-                adjusted_width = (max_length + 2)
-                sheet.column_dimensions[column_letter].width = adjusted_width
-
-            # Save the workbook to a bytes buffer
-            excel_buffer = BytesIO()
-            workbook.save(excel_buffer)
-            excel_buffer.seek(0)
-
-            # Add the workbook to the zip file
-            zf.writestr(f'JubanClientInventory_{folder.name}.xlsx', excel_buffer.getvalue())
-
-    buffer.seek(0)
-
-    # Set the response to return the zip file
-    response = HttpResponse(buffer, content_type='application/zip')
-    response['Content-Disposition'] = 'attachment; filename=juban_client_inventory_folders.zip'
-    return response
+    if request.method == 'POST':
+        return start_export_job('juban_client_folders')
+    return JsonResponse({'success': False, 'error': 'Invalid request method.'})
 
 
 def juban_export_transaction_history_to_excel(request):
     query = request.GET.get('q')  # Search query parameter
     date_query = request.GET.get('date')  # Date query parameter
 
-    # Start with all transactions
-    transactions = JubanInventoryHistory.objects.exclude(date__isnull=True).order_by('-date')
-
-    # Apply search filter
-    if query:
-        transactions = transactions.filter(
-            Q(date__icontains=query) |
-            Q(item_code__icontains=query) |
-            Q(supplier__icontains=query) |
-            Q(po_product_name__icontains=query) |
-            Q(new_product_name__icontains=query) |
-            Q(unit__icontains=query) |
-            Q(quantity_out__icontains=query) |
-            Q(price__icontains=query) |
-            Q(total_amount__icontains=query) |
-            Q(site_delivered__icontains=query) |
-            Q(client__icontains=query) |
-            Q(delivery_ref__icontains=query) |
-            Q(delivery_no__icontains=query) |
-            Q(invoice_type__icontains=query) |
-            Q(invoice_no__icontains=query)
-        )
+    # The transaction history page's rows, also narrowed by the date query (po/inventory.py)
+    transactions = stock_outs(JUBAN_SHOP, query, date_query)
 
-    # Apply date filter
-    if date_query:
-        try:
-            date_obj = datetime.strptime(date_query, '%b %d, %Y').date()
-            transactions = transactions.filter(date=date_obj)
-        except ValueError:
-            try:
-                date_obj = datetime.strptime(date_query, '%b %Y')
-                transactions = transactions.filter(date__year=date_obj.year, date__month=date_obj.month)
-            except ValueError:
-                try:
-                    date_obj = datetime.strptime(date_query, '%B %Y')
-                    transactions = transactions.filter(date__year=date_obj.year, date__month=date_obj.month)
-                except ValueError:
-                    try:
-                        month_number = int(date_query)
-                        transactions = transactions.filter(date__month=month_number)
-                    except ValueError:
-                        try:
-                            date_obj = datetime.strptime(date_query, '%B')
-                            transactions = transactions.filter(date__month=date_obj.month)
-                        except ValueError:
-                            pass
-
-    # Create a workbook and a sheet
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'Juban Transaction History'
-
-    header_font = Font(color='FFFFFF', bold=True)
-    black_fill = PatternFill(start_color='000000', end_color='000000', fill_type='solid')
-    currency_format = '#,##0.00'
-
-    # Define the headers
-    headers = [
-        'Date', 'Item Code', 'Supplier', 'PO Product Name', 'New Product Name',
-        'Unit', 'Quantity Out', 'Price', 'Total Amount', 'Site Delivered',
-        'Client', 'Delivery Ref#', 'Delivery No.', 'Invoice Type', 'Invoice#'
-    ]
-    sheet.append(headers)
-
-    for cell in sheet[1]:
-        cell.font = header_font
-        cell.fill = black_fill
-        cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-    # Populate the sheet with data
-    for transaction in transactions:
-        sheet.append([
-            transaction.date.strftime('%Y-%m-%d') if transaction.date else 'N/A',
-            transaction.item_code, transaction.supplier, transaction.po_product_name,
-            transaction.new_product_name, transaction.unit, transaction.quantity_out,
-            transaction.price, transaction.total_amount, transaction.site_delivered,
-            transaction.client, transaction.delivery_ref, transaction.delivery_no,
-            transaction.invoice_type, transaction.invoice_no
-        ])
-
-    # Apply currency format to Price and Total Amount columns
-    for cell in sheet['H']:  # Assuming price is in column H (index 8)
-        if cell.row > 1:  # Skip header row
-            cell.number_format = currency_format
-
-    for cell in sheet['I']:  # Assuming total_amount is in column I (index 9)
-        if cell.row > 1:  # Skip header row
-            cell.number_format = currency_format
-
-    # Auto-size columns for better visibility
-    for column in sheet.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        sheet.column_dimensions[column_letter].width = adjusted_width
-
-    # Create an in-memory buffer
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-
-    # Set the response to return the Excel file
-    response = HttpResponse(
-        buffer,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=TransactionHistory.xlsx'
-    return response
+    return xlsx_response('TransactionHistory.xlsx', TRANSACTION_HISTORY_SHEET.with_title('Juban Transaction History'),
+                         transactions)
 
 
 def juban_export_stock_in_transaction_history_to_excel(request):
     query = request.GET.get('q')  # Search query parameter
     date_query = request.GET.get('date')  # Date query parameter
 
-    # Start with all stock-in transactions
-    transactions = JubanStockInHistory.objects.exclude(date__isnull=True).order_by('-date')
-
-    # Apply search filter
-    if query:
-        transactions = transactions.filter(
-            Q(date__icontains=query) |
-            Q(item_code__icontains=query) |
-            Q(supplier__icontains=query) |
-            Q(particulars__icontains=query) |
-            Q(unit__icontains=query) |
-            Q(quantity_in__icontains=query) |
-            Q(invoice_no__icontains=query) |
-            Q(invoice_type__icontains=query)
-        )
+    # The stock-in history page's rows, also narrowed by the date query (po/inventory.py)
+    transactions = stock_ins(JUBAN_SHOP, query, date_query)
 
-    # Apply date filter
-    if date_query:
-        try:
-            date_obj = datetime.strptime(date_query, '%b %d, %Y').date()
-            transactions = transactions.filter(date=date_obj)
-        except ValueError:
-            try:
-                date_obj = datetime.strptime(date_query, '%b %Y')
-                transactions = transactions.filter(date__year=date_obj.year, date__month=date_obj.month)
-            except ValueError:
-                try:
-                    date_obj = datetime.strptime(date_query, '%B %Y')
-                    transactions = transactions.filter(date__year=date_obj.year, date__month=date_obj.month)
-                except ValueError:
-                    try:
-                        month_number = int(date_query)
-                        transactions = transactions.filter(date__month=month_number)
-                    except ValueError:
-                        try:
-                            date_obj = datetime.strptime(date_query, '%B')
-                            transactions = transactions.filter(date__month=date_obj.month)
-                        except ValueError:
-                            pass
-
-    # Create a workbook and a sheet
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    sheet.title = 'Stock In Transaction History'
-
-    header_font = Font(color='FFFFFF', bold=True)
-    black_fill = PatternFill(start_color='000000', end_color='000000', fill_type='solid')
-
-    # Define the headers
-    headers = [
-        'Date', 'PO#','Purchaser', 'Item Code', 'Particular', 'Unit',
-        'Quantity In', 'Supplier', 'Remarks', 'Invoice No.', 'Invoice Type'
-    ]
-    sheet.append(headers)
-
-    for cell in sheet[1]:
-        cell.font = header_font
-        cell.fill = black_fill
-        cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-    # Populate the sheet with data
-    for transaction in transactions:
-        sheet.append([
-            transaction.date.strftime('%Y-%m-%d') if transaction.date else 'N/A',
-            transaction.po_number, transaction.purchaser, transaction.item_code, transaction.particulars,
-            transaction.unit, transaction.quantity_in, transaction.supplier,
-            transaction.remarks, transaction.invoice_no, transaction.invoice_type
-        ])
-
-    # Auto-size columns for better visibility
-    for column in sheet.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = (max_length + 2)
-        sheet.column_dimensions[column_letter].width = adjusted_width
-
-    # Create an in-memory buffer
-    buffer = BytesIO()
-    workbook.save(buffer)
-    buffer.seek(0)
-
-    # Set the response to return the Excel file
-    response = HttpResponse(
-        buffer,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    response['Content-Disposition'] = 'attachment; filename=StockInTransactionHistory.xlsx'
-    return response
+    return xlsx_response('StockInTransactionHistory.xlsx', STOCK_IN_HISTORY_SHEET, transactions)
 
 
 def juban_transaction_history(request):
     query = request.GET.get('q')  # Get search query from request
     page_number = request.GET.get('page', 1)  # Get page number from request
 
-    # Dictionary to map full and abbreviated month names to month numbers
-    month_mapping = {
-        "January": "1", "February": "2", "March": "3", "April": "4",
-        "May": "5", "June": "6", "July": "7", "August": "8",
-        "September": "9", "October": "10", "November": "11", "December": "12",
-        "Jan": "1", "Feb": "2", "Mar": "3", "Apr": "4",
-        "Jun": "6", "Jul": "7", "Aug": "8", "Sep": "9", "Oct": "10", "Nov": "11", "Dec": "12"
-    }
-
-    # Retrieve all records from JubanInventoryHistory and exclude records where date is null
-    transactions = JubanInventoryHistory.objects.exclude(date__isnull=True).order_by('-date')
 
-    # Apply search filter if a query is present
-    if query:
-        try:
-            # Try to interpret the query as a full date (e.g., 'Aug 20, 2024')
-            date_obj = datetime.strptime(query, '%b %d, %Y').date()
-            transactions = transactions.filter(date=date_obj)
-        except ValueError:
-            # If it's not a full date, check if the query is a month name (full or abbreviated)
-            for month_name, month_number in month_mapping.items():
-                if month_name.lower() in query.lower():
-                    # Check if the query contains a year
-                    year = None
-                    try:
-                        year = int(query.split()[-1])  # Try to extract the year
-                    except (ValueError, IndexError):
-                        pass
-
-                    # Filter based on month and possibly year
-                    if year:
-                        transactions = transactions.filter(date__month=month_number, date__year=year)
-                    else:
-                        transactions = transactions.filter(date__month=month_number)
-                    break
-            else:
-                # If not a date or month, treat as a general text search
-                transactions = transactions.filter(
-                    Q(item_code__icontains=query) |
-                    Q(supplier__icontains=query) |
-                    Q(po_product_name__icontains=query) |
-                    Q(new_product_name__icontains=query) |
-                    Q(unit__icontains=query) |
-                    Q(quantity_out__icontains=query) |
-                    Q(price__icontains=query) |
-                    Q(total_amount__icontains=query) |
-                    Q(site_delivered__icontains=query) |
-                    Q(client__icontains=query)
-                )
+    # Dated transactions, newest first, narrowed by the search query (po/inventory.py)
+    transactions = stock_outs(JUBAN_SHOP, query)
 
     # Paginate the filtered transactions
-    paginator = Paginator(transactions, 100)  # Show 100 transactions per page
-    try:
-        transactions_page = paginator.page(page_number)
-    except PageNotAnInteger:
-        transactions_page = paginator.page(1)
-    except EmptyPage:
-        transactions_page = paginator.page(paginator.num_pages)
+    transactions_page = paginate(request, transactions, keys=HISTORY_KEYS, count='cached')
 
     return render(request, 'Jubanshop/Inventory/juban_transaction_history.html', {
         'transactions': transactions_page,
@@ -879,10 +224,8 @@ def juban_create_site_inventory_folder(request):
 
             if created:
                 # Handle matching transactions here
-                matching_transactions = JubanInventoryHistory.objects.filter(site_delivered=folder_name)
-                for transaction in matching_transactions:
-                    transaction.site_inventory_folder = new_folder
-                    transaction.save()
+                assign_folder(JubanInventoryHistory.objects.filter(site_delivered=folder_name), 'site_inventory_folder',
+                              new_folder)
 
                 return JsonResponse({'success': True, 'message': 'Folder created successfully.'})
             else:
@@ -925,18 +268,10 @@ def juban_view_site_inventory_folder_contents(request, folder_id):
     folder = get_object_or_404(JubanSiteInventoryFolder, id=folder_id)
     transactions_list = JubanInventoryHistory.objects.filter(site_inventory_folder=folder)
 
-    # Calculate total_amount
-    total_amount = transactions_list.aggregate(total_amount_sum=Sum('total_amount'))['total_amount_sum'] or 0
+    total_amount = folder.total_amount  # Kept current on the folder itself, see po/rollups.py
 
     # Pagination
-    paginator = Paginator(transactions_list, 100)  # Show 100 transactions per page
-    page_number = request.GET.get('page')
-    try:
-        transactions = paginator.page(page_number)
-    except PageNotAnInteger:
-        transactions = paginator.page(1)
-    except EmptyPage:
-        transactions = paginator.page(paginator.num_pages)
+    transactions = paginate(request, transactions_list)
 
     context = {
         'folder': folder,
@@ -956,10 +291,8 @@ def juban_create_client_inventory_folder(request):
 
             if created:
                 # Handle matching transactions here
-                matching_transactions = JubanInventoryHistory.objects.filter(client=folder_name)
-                for transaction in matching_transactions:
-                    transaction.client_inventory_folder = new_folder
-                    transaction.save()
+                assign_folder(JubanInventoryHistory.objects.filter(client=folder_name), 'client_inventory_folder',
+                              new_folder)
 
                 return JsonResponse(
                     {'success': True, 'message': 'Client folder created and transactions updated successfully.'})
@@ -1003,17 +336,10 @@ def juban_view_client_inventory_folder_contents(request, folder_id):
     folder = get_object_or_404(JubanClientInventoryFolder, id=folder_id)
     transactions_list = JubanInventoryHistory.objects.filter(client_inventory_folder=folder)
 
-    total_amount = transactions_list.aggregate(total_amount_sum=Sum('total_amount'))['total_amount_sum'] or 0
+    total_amount = folder.total_amount  # Kept current on the folder itself, see po/rollups.py
 
     # Pagination
-    paginator = Paginator(transactions_list, 100)  # Show 100 transactions per page
-    page_number = request.GET.get('page')
-    try:
-        transactions = paginator.page(page_number)
-    except PageNotAnInteger:
-        transactions = paginator.page(1)
-    except EmptyPage:
-        transactions = paginator.page(paginator.num_pages)
+    transactions = paginate(request, transactions_list)
 
     context = {
         'folder': folder,
@@ -1066,56 +392,33 @@ def juban_edit_remarks(request, transaction_id):
 def juban_bulk_edit_inventory(request):
     if request.method == 'POST':
         if 'add_to_cart' in request.POST:
-            item_ids = request.POST.getlist('item_ids')
+            quantities, invalid = posted_quantities(request.POST)
+            is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
 
             # Ensure there are selected items
-            success = False
-            for item_id in item_ids:
-                quantity_out = request.POST.get(f'quantity_out_{item_id}', '0')
-                quantity_out = Decimal(quantity_out) if quantity_out.strip() != '' else 0
-
-                if quantity_out > 0:
-                    success = True  # At least one valid item has been edited
-                    break
-
-            if not success:
-                messages.error(request,
-                               'No valid quantity out entered for any item. Please enter a quantity to add to the cart.')
+            if not quantities:
+                message = 'No valid quantity out entered for any item. Please enter a quantity to add to the cart.'
+                if is_ajax:
+                    return JsonResponse({'status': 'error', 'message': message})
+                messages.error(request, message)
                 return redirect('juban_bulk_edit_inventory')
 
-            success = True
-            errors = []
-
-            for item_id in item_ids:
-                quantity_out = request.POST.get(f'quantity_out_{item_id}', '0')
-                quantity_out = Decimal(quantity_out) if quantity_out.strip() != '' else 0
-
-                if quantity_out > 0:
-                    try:
-                        item = JubanItemInventory.objects.get(id=item_id)
-                        cart_item, created = JubanCart.objects.get_or_create(
-                            item=item,
-                            defaults={'quantity': quantity_out}
-                        )
-                        if not created:
-                            cart_item.quantity += quantity_out
-                            cart_item.save()
-
-                    except JubanItemInventory.DoesNotExist:
-                        success = False
-                        errors.append(f"Item with ID {item_id} does not exist.")
-                    except Exception as e:
-                        success = False
-                        errors.append(f"An error occurred for item ID {item_id}: {str(e)}")
-
-            if success:
-                messages.success(request, 'Items added to cart successfully.')
+            summary = add_to_cart(request, JUBAN_SHOP, quantities)
+            errors = [f"Item with ID {item_id} does not exist." for item_id in summary['missing']]
+            errors += [f"Invalid quantity out for item ID {item_id}." for item_id in invalid]
+            message = ('Items added to cart successfully.' if not errors
+                       else 'Some errors occurred: ' + ', '.join(errors))
+            if is_ajax:
+                # The page redraws the cart from the summary instead of reloading
+                return JsonResponse({'status': 'error' if errors else 'success', 'message': message, **summary})
+            if errors:
+                messages.error(request, message)
             else:
-                messages.error(request, 'Some errors occurred: ' + ', '.join(errors))
+                messages.success(request, message)
             return redirect('juban_bulk_edit_inventory')
 
         elif 'finalize_changes' in request.POST:
-            cart_items = JubanCart.objects.all()
+            cart_items = user_cart(request, JubanCart)
             if not cart_items.exists():
                 messages.error(request, 'No items in the cart to finalize.')
                 return redirect('juban_bulk_edit_inventory')
@@ -1130,85 +433,22 @@ def juban_bulk_edit_inventory(request):
                 invoice_type = form.cleaned_data['invoice_type']
                 invoice_no = form.cleaned_data['invoice_no']
 
-                success = True
-                errors = []
-
-                for cart_item in cart_items:
-                    try:
-                        item = cart_item.item
-                        quantity_out = cart_item.quantity
-                        price = item.price
-                        total_amount = quantity_out * price
-
-                        if location_type == 'site':
-                            folder, created = JubanSiteInventoryFolder.objects.get_or_create(name=location_name)
-                            item.site_inventory_folder = folder
-                            item.site_delivered = location_name
-
-                        elif location_type == 'client':
-                            client_folder, created = JubanClientInventoryFolder.objects.get_or_create(
-                                name=location_name)
-                            item.client_inventory_folder = client_folder
-                            item.client = location_name
-
-                        item.date = date
-                        item.quantity_out += quantity_out
-                        item.stock = item.quantity_in - item.quantity_out
-                        item.total_amount = total_amount
-                        item.delivery_ref = delivery_ref
-                        item.delivery_no = delivery_no
-                        item.invoice_type = invoice_type
-                        item.invoice_no = invoice_no
-                        item.site_or_client_choice = location_type
-                        item.save()
-
-                        JubanInventoryHistory.objects.create(
-                            item=item,
-                            date=date,
-                            item_code=item.item_code,
-                            supplier=item.supplier,
-                            po_product_name=item.po_product_name,
-                            unit=item.unit,
-                            quantity_in=item.quantity_in,
-                            quantity_out=quantity_out,
-                            stock=item.stock,
-                            price=price,
-                            total_amount=total_amount,
-                            delivery_ref=delivery_ref,
-                            delivery_no=delivery_no,
-                            invoice_type=invoice_type,
-                            invoice_no=invoice_no,
-                            site_inventory_folder=item.site_inventory_folder if location_type == 'site' else None,
-                            client_inventory_folder=item.client_inventory_folder if location_type == 'client' else None,
-                            site_delivered=item.site_delivered if location_type == 'site' else None,
-                            client=item.client if location_type == 'client' else None,
-                        )
-
-                        cart_item.delete()
-
-                    except JubanItemInventory.DoesNotExist:
-                        success = False
-                        errors.append(f"Item with ID {cart_item.item.id} does not exist.")
-                    except Exception as e:
-                        success = False
-                        errors.append(f"An error occurred for item ID {cart_item.item.id}: {str(e)}")
-
-                JubanCart.objects.all().delete()
-
-                if success:
+                try:
+                    # Delivered as one batch: if any row fails, nothing is taken out of stock
+                    finalize_cart(JUBAN_SHOP, cart_items, date, location_type, location_name, delivery_ref, delivery_no,
+                                  invoice_type, invoice_no)
+                    cart_changed(request, JubanCart)
                     messages.success(request, 'Items updated successfully.')
-                else:
-                    messages.error(request, 'Some errors occurred: ' + ', '.join(errors))
+                except Exception as e:
+                    messages.error(request, f'Some errors occurred: {e}')
                 return redirect('juban_bulk_edit_inventory')
 
     else:
         query = request.GET.get('q', '')
-        if query:
-            items = JubanItemInventory.objects.filter(po_product_name__icontains=query)
-        else:
-            items = JubanItemInventory.objects.all()
+        # Only the first page of the picker; the page fetches the rest from juban_bulk_inventory_items as it scrolls
+        items = picker_page(request, inventory_picker(JUBAN_SHOP, query))
 
-        cart_items = JubanCart.objects.all()
+        cart_items = user_cart(request, JubanCart).select_related('item')
         for cart_item in cart_items:
             cart_item.total_amount = cart_item.quantity * cart_item.item.price
 
@@ -1223,8 +463,9 @@ def juban_bulk_edit_inventory(request):
 
 
 def juban_remove_cart_item(request, cart_item_id):
-    cart_item = get_object_or_404(JubanCart, id=cart_item_id)
+    cart_item = get_object_or_404(JubanCart, id=cart_item_id, cart_key=cart_key(request))
     cart_item.delete()
+    cart_changed(request, JubanCart)
     messages.success(request, 'Item removed from cart successfully.')
     return redirect('juban_bulk_edit_inventory')
 
@@ -1254,11 +495,8 @@ def juban_stock_in_create(request):
                 stock_in.save()
 
                 # Ensure all existing stock in histories with the same supplier are associated with the folder
-                matching_histories = JubanStockInHistory.objects.filter(supplier=supplier_name,
-                                                                        supplier_folder__isnull=True)
-                for history in matching_histories:
-                    history.supplier_folder = folder
-                    history.save()
+                assign_folder(JubanStockInHistory.objects.filter(supplier=supplier_name, supplier_folder__isnull=True),
+                              'supplier_folder', folder)
 
             # Update or create the related JubanItemInventory record
             item_inventory, created = JubanItemInventory.objects.get_or_create(
@@ -1274,11 +512,8 @@ def juban_stock_in_create(request):
             )
 
             if not created:
-                # Update the existing JubanItemInventory record by adding the quantity_in
-                item_inventory.quantity_in += stock_in.quantity_in
-                item_inventory.stock = item_inventory.quantity_in - item_inventory.quantity_out
-                item_inventory.quantity_out = item_inventory.quantity_out or 0  # Ensure quantity_out is never None
-                item_inventory.save()
+                # Add the quantity_in to the existing JubanItemInventory record
+                receive(JUBAN_SHOP, item_inventory.id, stock_in.quantity_in)
 
             return JsonResponse({'status': 'success'})
         else:
@@ -1300,10 +535,7 @@ def juban_inventory_supplier_list_folders(request):
 
             if created:
                 # Handle matching stock in records here
-                matching_stock_ins = JubanStockInHistory.objects.filter(supplier=folder_name)
-                for stock_in in matching_stock_ins:
-                    stock_in.supplier_folder = new_folder
-                    stock_in.save()
+                assign_folder(JubanStockInHistory.objects.filter(supplier=folder_name), 'supplier_folder', new_folder)
 
                 return JsonResponse({'success': True, 'message': 'Folder created successfully.'})
             else:
@@ -1324,57 +556,11 @@ def juban_inventory_supplier_contents(request, folder_id):
     query = request.GET.get('q', '').strip()
     page_number = request.GET.get('page', 1)
 
-    # Initial queryset
-    stock_in_histories = JubanStockInHistory.objects.filter(supplier_folder=folder)
-
-    # If there's a search query, filter the stock in records accordingly
-    if query:
-        try:
-            # Try to interpret the query as a month number (e.g., "08" for August)
-            month_number = int(query)
-            stock_in_histories = stock_in_histories.filter(date__month=month_number)
-        except ValueError:
-            try:
-                # Try to interpret the query as a full month name only (e.g., "August")
-                month_mapping = {
-                    "January": "1", "February": "2", "March": "3", "April": "4",
-                    "May": "5", "June": "6", "July": "7", "August": "8",
-                    "September": "9", "October": "10", "November": "11", "December": "12"
-                }
-                month_number = month_mapping.get(query.capitalize())
-                if month_number:
-                    stock_in_histories = stock_in_histories.filter(date__month=month_number)
-                else:
-                    raise ValueError("Not a valid month name")
-            except ValueError:
-                # If not a date, treat it as a general text search
-                stock_in_histories = stock_in_histories.filter(
-                    Q(po_number__icontains=query) |
-                    Q(purchaser__icontains=query) |
-                    Q(item_code__icontains=query) |
-                    Q(particulars__icontains=query) |
-                    Q(quantity_in__icontains=query) |
-                    Q(unit__icontains=query) |
-                    Q(fbbd_ref_number__icontains=query) |
-                    Q(remarks__icontains=query) |
-                    Q(supplier__icontains=query) |
-                    Q(delivery_ref__icontains=query) |
-                    Q(delivery_no__icontains=query) |
-                    Q(invoice_type__icontains=query) |
-                    Q(invoice_no__icontains=query) |
-                    Q(payment_req_ref__icontains=query) |
-                    Q(payment_details__icontains=query) |
-                    Q(remarks2__icontains=query)
-                )
+    # The folder's stock-ins, narrowed by the search query (po/inventory.py)
+    stock_in_histories = supplier_stock_ins(JUBAN_SHOP, folder, query)
 
     # Pagination
-    paginator = Paginator(stock_in_histories, 100)  # Show 100 records per page
-    try:
-        stock_in_records = paginator.page(page_number)
-    except PageNotAnInteger:
-        stock_in_records = paginator.page(1)
-    except EmptyPage:
-        stock_in_records = paginator.page(paginator.num_pages)
+    stock_in_records = paginate(request, stock_in_histories)
 
     # Render the template with the context
     context = {
@@ -1390,83 +576,9 @@ def juban_export_inventory_supplier_contents(request, folder_id):
     try:
         # Get the JubanInventorySupplierFolder by ID
         folder = JubanInventorySupplierFolder.objects.get(id=folder_id)
-        stock_in_list = JubanStockInHistory.objects.filter(supplier_folder=folder)
-
-        # Create a workbook and a sheet
-        workbook = Workbook()
-        sheet = workbook.active
-        sheet.title = 'Stock In Records'
-
-        # Define header styles
-        header_font = Font(bold=True)
-        blue_fill = PatternFill(start_color='00B0F0', end_color='00B0F0', fill_type='solid')
-        currency_format = '#,##0.00'
-
-        # Define the headers
-        headers = [
-            'Date', 'PO Number', 'Purchaser', 'Item Code', 'Particular',
-            'Quantity In', 'Unit', 'FBBD Ref#', 'Remarks', 'Supplier',
-            'Delivery Ref#', 'Delivery No.', 'Invoice Type', 'Invoice No.',
-            'Payment Req Ref#', 'Payment Details', 'Remarks2'
-        ]
-        sheet.append(headers)
-
-        for cell in sheet[1]:
-            cell.font = header_font
-            cell.fill = blue_fill
-            cell.value = cell.value.upper() if cell.value is not None else cell.value
-
-        # Populate the sheet with data
-        for stock_in in stock_in_list:
-            sheet.append([
-                stock_in.date.strftime('%Y-%m-%d') if stock_in.date else 'N/A',
-                stock_in.po_number,
-                stock_in.purchaser,
-                stock_in.item_code,
-                stock_in.particulars,
-                stock_in.quantity_in,
-                stock_in.unit,
-                stock_in.fbbd_ref_number,
-                stock_in.remarks,
-                stock_in.supplier,
-                stock_in.delivery_ref,
-                stock_in.delivery_no,
-                stock_in.invoice_type,
-                stock_in.invoice_no,
-                stock_in.payment_req_ref,
-                stock_in.payment_details,
-                stock_in.remarks2
-            ])
-
-        for cell in sheet['F']:  # Assuming quantity_in is in column F (index 6)
-            if cell.row > 1:  # Skip header row
-                cell.number_format = currency_format
-
-        # Auto-adjust column widths based on content
-        for column in sheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter  # Get the column name (e.g., 'A', 'B', etc.)
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            adjusted_width = (max_length + 2)  # Add extra space for better visibility
-            sheet.column_dimensions[column_letter].width = adjusted_width
-
-        # Create an in-memory buffer
-        buffer = BytesIO()
-        workbook.save(buffer)
-        buffer.seek(0)
-
-        # Set the response to return the Excel file
-        response = HttpResponse(
-            buffer,
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = f'attachment; filename=StockInRecords_{folder.name}.xlsx'
-        return response
+        stock_in_list = supplier_stock_ins(JUBAN_SHOP, folder)
+
+        return xlsx_response(f'StockInRecords_{folder.name}.xlsx', STOCK_IN_RECORDS_SHEET, stock_in_list)
 
     except JubanInventorySupplierFolder.DoesNotExist:
         return HttpResponse("Juban Inventory Supplier Folder not found", status=404)
@@ -1476,84 +588,47 @@ def juban_get_item_details(request):
     particulars = request.GET.get('particulars', None)
 
     if particulars:
-        try:
-            item = JubanItemInventory.objects.get(po_product_name=particulars)
-            return JsonResponse({
-                'item_code': item.item_code,
-                'unit': item.unit,
-                'supplier': item.supplier,
-            })
-        except JubanItemInventory.DoesNotExist:
-            return JsonResponse({'error': 'Item not found'}, status=404)
+        # Same cached lookup as the batch endpoint; a name shared by several items resolves to the first
+        found, _, _ = lookup_item_details(JUBAN_SHOP, names=[particulars])
+        if particulars in found:
+            return JsonResponse(found[particulars])
+        return JsonResponse({'error': 'Item not found'}, status=404)
 
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+def juban_get_item_details_batch(request):
+    # Details of many items in one request, by product name and/or id, see po/catalog.py
+    return item_details_response(request, JUBAN_SHOP)
+
+
+def juban_bulk_inventory_items(request):
+    # JSON feed of the bulk delivery item picker: ?q= filters by name, ?after= continues from the last page
+    page = picker_page(request, inventory_picker(JUBAN_SHOP, request.GET.get('q', '')))
+    return picker_response(page, inventory_row)
+
+
+def juban_product_typeahead(request):
+    # Select2 source for the stock-in particulars field: only the product names matching ?q=
+    names = search_product_names(JUBAN_SHOP, request.GET.get('q', ''))
+    return JsonResponse({'results': [{'id': name, 'text': name} for name in names]})
+
+
 def juban_get_item_inventory(request):
-    items = list(JubanItemInventory.objects.values('id', 'po_product_name'))
-    return JsonResponse({
-        'items': [{'id': item['id'], 'text': item['po_product_name']} for item in items]
-    })
+    # Versioned catalog feed with ETag and ?since= deltas, see po/catalog.py
+    return catalog_response(request, JUBAN_SHOP)
 
 
 def juban_stock_in_transaction_history(request):
     query = request.GET.get('q')  # Get search query from request
     page_number = request.GET.get('page', 1)  # Get page number from request
 
-    # Dictionary to map full and abbreviated month names to month numbers
-    month_mapping = {
-        "January": "1", "February": "2", "March": "3", "April": "4",
-        "May": "5", "June": "6", "July": "7", "August": "8",
-        "September": "9", "October": "10", "November": "11", "December": "12",
-        "Jan": "1", "Feb": "2", "Mar": "3", "Apr": "4",
-        "Jun": "6", "Jul": "7", "Aug": "8", "Sep": "9", "Oct": "10", "Nov": "11", "Dec": "12"
-    }
 
-    # Retrieve all records from JubanStockInHistory and exclude records where date is null
-    stock_in_transactions = JubanStockInHistory.objects.exclude(date__isnull=True).order_by('-date')
-
-    # Apply search filter if a query is present
-    if query:
-        try:
-            # Try to interpret the query as a full date (e.g., 'Aug 20, 2024')
-            date_obj = datetime.strptime(query, '%b %d, %Y').date()
-            stock_in_transactions = stock_in_transactions.filter(date=date_obj)
-        except ValueError:
-            # If it's not a full date, check if the query is a month name (full or abbreviated)
-            for month_name, month_number in month_mapping.items():
-                if month_name.lower() in query.lower():
-                    year = None
-                    try:
-                        year = int(query.split()[-1])  # Try to extract the year
-                    except (ValueError, IndexError):
-                        pass
-
-                    if year:
-                        stock_in_transactions = stock_in_transactions.filter(date__month=month_number, date__year=year)
-                    else:
-                        stock_in_transactions = stock_in_transactions.filter(date__month=month_number)
-                    break
-            else:
-                # If not a date or month, treat as a general text search
-                stock_in_transactions = stock_in_transactions.filter(
-                    Q(item_code__icontains=query) |
-                    Q(supplier__icontains=query) |
-                    Q(particulars__icontains=query) |
-                    Q(unit__icontains=query) |
-                    Q(quantity_in__icontains=query) |
-                    Q(remarks__icontains=query) |
-                    Q(invoice_no__icontains=query) |
-                    Q(po_number__icontains=query)
-                )
+    # Dated stock-ins, newest first, narrowed by the search query (po/inventory.py)
+    stock_in_transactions = stock_ins(JUBAN_SHOP, query)
 
     # Paginate the filtered stock-in transactions
-    paginator = Paginator(stock_in_transactions, 100)  # Show 100 transactions per page
-    try:
-        stock_in_page = paginator.page(page_number)
-    except PageNotAnInteger:
-        stock_in_page = paginator.page(1)
-    except EmptyPage:
-        stock_in_page = paginator.page(paginator.num_pages)
+    stock_in_page = paginate(request, stock_in_transactions, keys=HISTORY_KEYS, count='cached')
 
     return render(request, 'Jubanshop/stockIn/juban_stock_in_transaction_history.html', {
         'stock_in_transactions': stock_in_page,
@@ -1563,69 +638,7 @@ def juban_stock_in_transaction_history(request):
 
 
 def juban_handle_uploaded_stock_in_file(f):
-    df = pd.read_excel(f, engine='openpyxl')
-    df = df.fillna('')  # Replace NaN with an empty string
-
-    for _, row in df.iterrows():
-        # Create or update the JubanStockInHistory record
-        stock_in = JubanStockInHistory(
-            date=row.get('DATE'),
-            po_number=row.get('PO NUMBER'),
-            purchaser=row.get('PURCHASER'),
-            item_code=row.get('ITEM CODE'),
-            particulars=row.get('PARTICULAR'),
-            quantity_in=row.get('QUANTITY IN'),
-            unit=row.get('UNIT'),
-            supplier=row.get('SUPPLIER'),
-            delivery_ref=row.get('DELIVERY REF#'),
-            delivery_no=row.get('DELIVERY NO.'),
-            invoice_type=row.get('INVOICE TYPE'),
-            invoice_no=row.get('INVOICE NO.'),
-            payment_req_ref=row.get('PAYMENT REQ REF#'),
-            payment_details=row.get('PAYMENT DETAILS'),
-            remarks=row.get('REMARKS'),
-            remarks2=row.get('REMARKS2')
-        )
-
-        # Check if the supplier folder exists or create a new one
-        supplier_name = stock_in.supplier
-        if supplier_name:
-            folder, created = JubanInventorySupplierFolder.objects.get_or_create(name=supplier_name)
-            # Update the stock in history to reference the SupplierFolder
-            stock_in.supplier_folder = folder
-
-        # Save the stock in history record
-        stock_in.save()
-
-        # Inventory update logic:
-        # Check if an inventory record for the item exists
-        inventory_item = JubanItemInventory.objects.filter(
-            item_code=stock_in.item_code,
-            supplier=stock_in.supplier,
-            po_product_name=stock_in.particulars,
-            unit=stock_in.unit,
-        ).first()
-
-        if inventory_item:
-            # Update the existing inventory record by adding the quantity_in
-            inventory_item.quantity_in += stock_in.quantity_in
-            inventory_item.stock = inventory_item.quantity_in - inventory_item.quantity_out
-            inventory_item.save()
-        else:
-            # If no inventory record exists, create a new one
-            JubanItemInventory.objects.create(
-                item_code=stock_in.item_code,
-                supplier=stock_in.supplier,
-                po_product_name=stock_in.particulars,
-                unit=stock_in.unit,
-                quantity_in=stock_in.quantity_in,
-                quantity_out=0,  # New stock-in, no items taken out yet
-                stock=stock_in.quantity_in,  # Stock is initially the quantity in
-                delivery_ref=stock_in.delivery_ref,
-                delivery_no=stock_in.delivery_no,
-                invoice_type=stock_in.invoice_type,
-                invoice_no=stock_in.invoice_no
-            )
+    return import_stock_in(f, JUBAN_SHOP)
 
 
 def juban_upload_stock_in_file(request):
@@ -1633,10 +646,13 @@ def juban_upload_stock_in_file(request):
         form = JubanUploadFileForm(request.POST, request.FILES)
         if form.is_valid():
             try:
-                juban_handle_uploaded_stock_in_file(request.FILES['file'])
-                return JsonResponse({'status': 'success', 'message': 'Stock-in data imported successfully.'})
+                summary, errors = juban_handle_uploaded_stock_in_file(request.FILES['file'])
             except Exception as e:
                 return JsonResponse({'status': 'error', 'message': str(e)})
+
+            if errors and not summary['rows']:
+                return JsonResponse({'status': 'error', 'message': 'No rows were imported.', 'errors': errors})
+            return JsonResponse({'status': 'success', 'message': stock_in_message(summary, errors), 'errors': errors})
     else:
         form = JubanUploadFileForm()
 
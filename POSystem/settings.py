@@ -64,6 +64,20 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Background "Export All" archives
+EXPORT_JOB_RUNNER = 'thread'  # 'thread' builds archives inside the web process, 'worker' leaves them to run_export_jobs
+EXPORT_JOB_WORKERS = 2  # Archives built at the same time
+EXPORT_FOLDER_WORKERS = 4  # Folder workbooks built in parallel for one archive
+EXPORT_FOLDER_POOL = 'thread'  # 'serial', 'thread' or 'process'
+EXPORT_JOB_DIR = os.path.join(MEDIA_ROOT, 'exports')
+EXPORT_JOB_STALE_SECONDS = 1800  # A running archive without progress for this long lost its runner and is requeued
+EXPORT_JOB_MAX_ATTEMPTS = 2  # Runs an archive gets before an interrupted one is marked failed
+EXPORT_JOB_PENDING_SECONDS = 60  # With the thread runner, a job still pending after this long is handed to the pool again
+
+PAGINATION_COUNT_CACHE_SECONDS = 60  # How long the history pages reuse a COUNT(*)
+
+ROLE_CACHE_SECONDS = 300  # How long a session trusts its cached dashboard role; group changes invalidate it sooner
+
 
 TEMPLATES = [
     {
@@ -0,0 +1,101 @@
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Min, Sum, Value, When
+
+CART_KEY = 'cart_key'
+CART_SIZES = 'cart_sizes'
+
+
+# Carts belong to the browser session that fills them: each session gets a random cart key, stored in the
+# session itself so it survives login() rotating the session id. Two clerks therefore build separate
+# deliveries, and reading a cart touches only that session's rows (cart_key is indexed).
+
+def cart_key(request):
+    key = request.session.get(CART_KEY)
+    if not key:
+        key = request.session[CART_KEY] = uuid.uuid4().hex
+    return key
+
+
+def cart_user(request):
+    # Stamped on new cart rows as their owner
+    return request.user if request.user.is_authenticated else None
+
+
+def user_cart(request, model):
+    # Only this session writes to its cart, so the row count remembered in the session is exact and an
+    # empty cart needs no query at all
+    if request.session.get(CART_SIZES, {}).get(model._meta.label_lower) == 0:
+        return model.objects.none()
+    return model.objects.filter(cart_key=cart_key(request))
+
+
+def cart_changed(request, model, size=None):
+    # Call after adding to or removing from the cart; refreshes the remembered size
+    if size is None:
+        size = model.objects.filter(cart_key=cart_key(request)).count()
+    sizes = request.session.get(CART_SIZES, {})
+    sizes[model._meta.label_lower] = size
+    request.session[CART_SIZES] = sizes
+
+
+def posted_quantities(post):
+    # {item id: quantity} for every selected item with a positive quantity_out_<id>, plus the ids whose
+    # quantity couldn't be read. Each field is parsed once.
+    quantities, invalid = {}, []
+    for item_id in post.getlist('item_ids'):
+        value = post.get(f'quantity_out_{item_id}', '').strip()
+        if not value:
+            continue
+        try:
+            quantity, item_id = Decimal(value), int(item_id)
+            if not quantity.is_finite():
+                # NaN and Infinity parse, but comparing NaN raises
+                raise InvalidOperation
+            if quantity <= 0:
+                continue
+        except (InvalidOperation, ValueError):
+            invalid.append(item_id)
+            continue
+        quantities[item_id] = quantities.get(item_id, 0) + quantity
+    return quantities, invalid
+
+
+def add_to_cart(request, shop, quantities):
+    # Adds {item id: quantity} to the session's cart in a fixed number of queries: the items in one
+    # in_bulk, the lines already in the cart in one SELECT, the missing lines in one bulk_create and every
+    # quantity in one UPDATE. New lines go in empty and skip any line a concurrent submit inserted first
+    # ((cart_key, item) is unique), then all lines get quantity = quantity + delta, so two submits never
+    # make duplicate lines or lose an addition. Returns a summary the page can show without reloading.
+    model = shop.cart
+    key = cart_key(request)
+    with transaction.atomic():
+        items = shop.item_inventory.objects.in_bulk(list(quantities))
+        missing = sorted(set(quantities) - set(items))
+        existing = set(model.objects.filter(cart_key=key, item_id__in=list(items))
+                       .values_list('item_id', flat=True))
+        owner = cart_user(request)
+        model.objects.bulk_create([model(item=item, quantity=0, cart_key=key, owner=owner)
+                                   for item_id, item in items.items() if item_id not in existing],
+                                  ignore_conflicts=True)
+        if items:
+            model.objects.filter(cart_key=key, item_id__in=list(items)).update(quantity=F('quantity') + Case(
+                *[When(item_id=item_id, then=Value(quantities[item_id])) for item_id in items],
+                default=Value(0), output_field=models.DecimalField(max_digits=10, decimal_places=2)))
+    cart = [{'id': row.id, 'item_id': row.item_id, 'name': row.item.po_product_name, 'quantity': row.quantity}
+            for row in model.objects.filter(cart_key=key).select_related('item').order_by('id')]
+    cart_changed(request, model, size=len(cart))
+    return {'added': len(items) - len(existing), 'merged': len(existing), 'missing': missing, 'cart': cart}
+
+
+def merge_duplicate_lines(model, using='default'):
+    # Folds cart lines repeating a (cart_key, item) into the first of them, summing the quantities; run
+    # before the unique constraint on the pair is added
+    duplicates = (model.objects.using(using).values('cart_key', 'item_id').order_by()
+                  .annotate(lines=Count('id'), first=Min('id'), total=Sum('quantity')).filter(lines__gt=1))
+    for line in duplicates:
+        model.objects.using(using).filter(id=line['first']).update(quantity=line['total'])
+        model.objects.using(using).filter(cart_key=line['cart_key'], item_id=line['item_id']) \
+            .exclude(id=line['first']).delete()
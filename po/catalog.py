@@ -0,0 +1,207 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+
+CATALOG_CACHE_SECONDS = getattr(settings, 'CATALOG_CACHE_SECONDS', 300)
+TYPEAHEAD_LIMIT = 20
+MAX_DELTA_VERSIONS = 200  # Clients further behind than this get the whole catalog again
+
+BATCH_SIZE = 1000
+
+
+def sync_item_codes(shop, entries):
+    # entries are (item_code, po_product_name, unit) tuples from inventory writes. Adds the
+    # (item_code, po_product_name) pairs the shop's item code list doesn't have yet; the first
+    # unit seen for a pair is kept, as before.
+    pending = {}
+    for item_code, po_product_name, unit in entries:
+        if po_product_name:
+            pending.setdefault((item_code, po_product_name), unit)
+    if not pending:
+        return 0
+
+    existing = set()
+    names = list({po_product_name for _, po_product_name in pending})
+    for start in range(0, len(names), BATCH_SIZE):
+        existing.update(shop.item_code_list.objects.filter(po_product_name__in=names[start:start + BATCH_SIZE])
+                        .values_list('item_code', 'po_product_name'))
+
+    missing = [
+        shop.item_code_list(item_code=item_code, po_product_name=po_product_name, unit=unit)
+        for (item_code, po_product_name), unit in pending.items()
+        if (item_code, po_product_name) not in existing
+    ]
+    shop.item_code_list.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+    return len(missing)
+
+
+def reconcile_item_codes(shop):
+    # Full catch-up: every (item_code, po_product_name) in the inventory gets an item code entry
+    entries = shop.item_inventory.objects.order_by('id').values_list('item_code', 'po_product_name', 'unit')
+    return sync_item_codes(shop, entries.iterator(chunk_size=BATCH_SIZE))
+
+
+
+# The distinct product names of a shop's inventory, for the stock-in particulars field and its typeahead,
+# and the catalog feed below are cached under a version that inventory writes bump (catalog_changed), so a
+# write is seen by the next request. The version is a counter started from the clock; it and everything
+# cached under it expire after CATALOG_CACHE_SECONDS, which bounds staleness when the cache isn't shared
+# between processes.
+
+def catalog_version(shop):
+    key = f'catalog-version:{shop}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), CATALOG_CACHE_SECONDS)
+        version = cache.get(key)
+    return version
+
+
+def catalog_changed(shop, ids=None):
+    # ids are the items written, when known; they're logged under the new version so feed clients can
+    # fetch just those (?since=). Runs once the write is committed, so the next read sees it.
+    transaction.on_commit(lambda: _bump_version(shop, ids))
+
+
+def _bump_version(shop, ids):
+    try:
+        version = cache.incr(f'catalog-version:{shop}')
+    except ValueError:
+        # No current version: the next read starts a new one, which no client can hold yet
+        return
+    if ids is not None:
+        cache.set(f'catalog-change:{shop}:{version}', list(ids), CATALOG_CACHE_SECONDS)
+
+
+def changed_since(shop, since, version):
+    # The ids written between versions since and version, or None when the log can't tell: since is from an
+    # earlier version run or too far behind, or a write didn't record its ids
+    if not 0 <= version - since <= MAX_DELTA_VERSIONS:
+        return None
+    keys = [f'catalog-change:{shop}:{number}' for number in range(since + 1, version + 1)]
+    entries = cache.get_many(keys)
+    if len(entries) != len(keys):
+        return None
+    return set().union(*entries.values())
+
+
+def product_names(shop):
+    key = f'catalog-names:{shop}:{catalog_version(shop)}'
+    names = cache.get(key)
+    if names is None:
+        names = sorted(shop.item_inventory.objects.exclude(po_product_name__isnull=True).exclude(po_product_name='')
+                       .values_list('po_product_name', flat=True).distinct())
+        cache.set(key, names, CATALOG_CACHE_SECONDS)
+    return names
+
+
+def product_choices(shop):
+    return [(name, name) for name in product_names(shop)]
+
+
+def search_product_names(shop, term, limit=TYPEAHEAD_LIMIT):
+    # Names containing every word of term, the ones starting with it first
+    words = term.casefold().split()
+    if not words:
+        return []
+    prefix = term.casefold().strip()
+    matches = [name for name in product_names(shop) if all(word in name.casefold() for word in words)]
+    matches.sort(key=lambda name: not name.casefold().startswith(prefix))
+    return matches[:limit]
+
+
+# Item details (item_code, unit, supplier) for the stock-in form, looked up by product name or id. One
+# query builds both maps per catalog version. Names aren't unique (two suppliers can stock the same
+# product), so a name resolves to its first item by id, like sync_item_codes keeps the first unit seen.
+
+def item_details(shop):
+    # ({name: details}, {id: details})
+    key = f'catalog-details:{shop}:{catalog_version(shop)}'
+    details = cache.get(key)
+    if details is None:
+        by_name, by_id = {}, {}
+        rows = shop.item_inventory.objects.order_by('id').values_list('id', 'po_product_name', 'item_code', 'unit',
+                                                                     'supplier')
+        for item_id, name, item_code, unit, supplier in rows:
+            by_id[item_id] = {'id': item_id, 'particulars': name, 'item_code': item_code, 'unit': unit,
+                              'supplier': supplier}
+            if name:
+                by_name.setdefault(name, by_id[item_id])
+        details = (by_name, by_id)
+        cache.set(key, details, CATALOG_CACHE_SECONDS)
+    return details
+
+
+def lookup_item_details(shop, names=(), ids=()):
+    # Returns ({name: details}, {id: details}, missing names and ids)
+    by_name, by_id = item_details(shop)
+    found_names = {name: by_name[name] for name in names if name in by_name}
+    found_ids = {item_id: by_id[item_id] for item_id in ids if item_id in by_id}
+    missing = [name for name in names if name not in by_name] + [item_id for item_id in ids if item_id not in by_id]
+    return found_names, found_ids, missing
+
+
+def item_details_response(request, shop):
+    # ?particulars=<name> and ?id=<id>, each repeatable (or posted, for long lists)
+    data = request.POST if request.method == 'POST' else request.GET
+    names = data.getlist('particulars')
+    try:
+        ids = [int(item_id) for item_id in data.getlist('id')]
+    except ValueError:
+        return JsonResponse({'error': 'Invalid item id'}, status=400)
+    if not names and not ids:
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    found_names, found_ids, missing = lookup_item_details(shop, names, ids)
+    return JsonResponse({'items': found_names, 'ids': found_ids, 'missing': missing})
+
+
+# The catalog feed: every item's id and name, for clients that keep the list themselves. The full payload
+# is serialized once per version and served with an ETag, so an unchanged catalog answers 304; with
+# ?since=<version> only the items written after that version are sent, plus the ids of deleted ones.
+
+def catalog_feed(shop):
+    # (version, etag, body) of the whole catalog
+    version = catalog_version(shop)
+    key = f'catalog-feed:{shop}:{version}'
+    feed = cache.get(key)
+    if feed is None:
+        items = [{'id': item_id, 'text': name} for item_id, name in
+                 shop.item_inventory.objects.order_by('id').values_list('id', 'po_product_name')]
+        serialized = json.dumps(items)
+        # Tagged by content rather than version, so a client keeps its copy across version changes that
+        # didn't touch the list (a stock save, an expired version)
+        etag = '"%s"' % hashlib.md5(serialized.encode()).hexdigest()
+        body = '{"version": "%s", "full": true, "items": %s}' % (version, serialized)
+        feed = (version, etag, body.encode())
+        cache.set(key, feed, CATALOG_CACHE_SECONDS)
+    return feed
+
+
+def catalog_response(request, shop):
+    version, etag, body = catalog_feed(shop)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        try:
+            ids = changed_since(shop, int(request.GET['since']), version)
+        except (KeyError, ValueError):
+            ids = None
+        if ids is None:
+            response = HttpResponse(body, content_type='application/json')
+        else:
+            names = dict(shop.item_inventory.objects.filter(id__in=ids).values_list('id', 'po_product_name'))
+            response = JsonResponse({
+                'version': str(version),  # As a string: it doesn't fit a JavaScript number
+                'full': False,
+                'items': [{'id': item_id, 'text': name} for item_id, name in sorted(names.items())],
+                'removed': sorted(ids - names.keys()),
+            })
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'  # Always revalidated with If-None-Match
+    return response
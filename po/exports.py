@@ -0,0 +1,281 @@
+import tempfile
+import zipfile
+from itertools import chain, islice
+
+from django.http import StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+ZIP_CONTENT_TYPE = 'application/zip'
+CURRENCY_FORMAT = '#,##0.00'
+
+# Rows are pulled from the database in chunks of this size instead of loading the whole queryset
+CHUNK_SIZE = 2000
+# Column widths are computed from the header and this many leading rows (write-only sheets
+# need their widths before the first row is written)
+WIDTH_SAMPLE_SIZE = 500
+# Size of the pieces the finished file is streamed to the client in
+STREAM_BLOCK_SIZE = 64 * 1024
+
+BOLD_FONT = Font(bold=True)
+WHITE_BOLD_FONT = Font(color='FFFFFF', bold=True)
+BLUE_FILL = PatternFill(start_color='00B0F0', end_color='00B0F0', fill_type='solid')
+GOLD_FILL = PatternFill(start_color='F59B00', end_color='F59B00', fill_type='solid')
+BLACK_FILL = PatternFill(start_color='000000', end_color='000000', fill_type='solid')
+
+
+def format_date(value):
+    return value.strftime('%Y-%m-%d') if value else 'N/A'
+
+
+def format_or_na(value):
+    return value if value else 'N/A'
+
+
+class Column:
+    def __init__(self, header, field, number_format=None, formatter=None):
+        self.header = header
+        self.field = field  # Lookup passed to values_list(), e.g. 'date' or 'item__po_product_name'
+        self.number_format = number_format
+        self.formatter = formatter
+
+
+class SheetSpec:
+    def __init__(self, title, columns, header_font=BOLD_FONT, header_fill=BLUE_FILL, upper_headers=True):
+        self.title = title
+        self.columns = columns
+        self.header_font = header_font
+        self.header_fill = header_fill
+        self.upper_headers = upper_headers
+
+    @property
+    def fields(self):
+        return [column.field for column in self.columns]
+
+    def with_title(self, title):
+        return SheetSpec(title, self.columns, self.header_font, self.header_fill, self.upper_headers)
+
+    def rows(self, queryset, chunk_size=CHUNK_SIZE):
+        # Plain tuples straight from the cursor; no model instances are built
+        return queryset.values_list(*self.fields).iterator(chunk_size=chunk_size)
+
+
+PURCHASE_ORDER_SHEET = SheetSpec('Purchase Orders', [
+    Column('Date', 'date', formatter=format_date),
+    Column('PO Number', 'po_number'),
+    Column('Purchaser', 'purchaser'),
+    Column('Brand', 'brand'),
+    Column('Item Code', 'item_code'),
+    Column('Particulars', 'particulars'),
+    Column('Quantity', 'quantity'),
+    Column('Unit', 'unit'),
+    Column('Price', 'price', number_format=CURRENCY_FORMAT),
+    Column('Total Amount', 'total_amount', number_format=CURRENCY_FORMAT),
+    Column('Site Delivered', 'site_delivered'),
+    Column('FBBD Ref#', 'fbbd_ref_number'),
+    Column('Remarks', 'remarks'),
+    Column('Supplier', 'supplier'),
+    Column('Delivery Ref#', 'delivery_ref'),
+    Column('Delivery No.', 'delivery_no'),
+    Column('Invoice Type', 'invoice_type'),
+    Column('Invoice No.', 'invoice_no'),
+    Column('Payment Req Ref#', 'payment_req_ref'),
+    Column('Payment Details', 'payment_details'),
+    Column('Remarks2', 'remarks2'),
+])
+
+INVENTORY_SHEET = SheetSpec('Inventory', [
+    Column('Item Code', 'item_code'),
+    Column('Supplier', 'supplier'),
+    Column('Particular', 'po_product_name'),
+    Column('New Product Name', 'new_product_name'),
+    Column('Unit', 'unit'),
+    Column('Quantity In', 'quantity_in'),
+    Column('Quantity Out', 'quantity_out'),
+    Column('Stock', 'stock'),
+    Column('Price', 'price', number_format=CURRENCY_FORMAT),
+    Column('Total Amount', 'total_amount', number_format=CURRENCY_FORMAT),
+], upper_headers=False)
+
+TRANSACTION_HISTORY_SHEET = SheetSpec('Transaction History', [
+    Column('Date', 'date', formatter=format_date),
+    Column('Item Code', 'item_code'),
+    Column('Supplier', 'supplier'),
+    Column('PO Product Name', 'po_product_name'),
+    Column('New Product Name', 'new_product_name'),
+    Column('Unit', 'unit'),
+    Column('Quantity Out', 'quantity_out'),
+    Column('Price', 'price', number_format=CURRENCY_FORMAT),
+    Column('Total Amount', 'total_amount', number_format=CURRENCY_FORMAT),
+    Column('Site Delivered', 'site_delivered'),
+    Column('Client', 'client'),
+    Column('Delivery Ref#', 'delivery_ref'),
+    Column('Delivery No.', 'delivery_no'),
+    Column('Invoice Type', 'invoice_type'),
+    Column('Invoice#', 'invoice_no'),
+], header_font=WHITE_BOLD_FONT, header_fill=BLACK_FILL)
+
+SITE_FOLDER_SHEET = SheetSpec('Site Inventory Records', [
+    Column('Transaction ID', 'id'),
+    Column('Site Delivered', 'site_delivered'),
+    Column('Date', 'date', formatter=format_date),
+    Column('Item', 'item__po_product_name'),
+    Column('Quantity In', 'quantity_in'),
+    Column('Quantity Out', 'quantity_out'),
+    Column('Price', 'price', number_format=CURRENCY_FORMAT),
+    Column('Total Amount', 'total_amount', number_format=CURRENCY_FORMAT),
+    Column('Delivery Ref', 'delivery_ref'),
+    Column('Delivery No.', 'delivery_no'),
+])
+
+CLIENT_FOLDER_SHEET = SheetSpec('Client Inventory Records', [
+    Column('Transaction ID', 'id'),
+    Column('Client', 'client', formatter=format_or_na),
+    Column('Date', 'date', formatter=format_date),
+    Column('Item', 'item__po_product_name'),
+    Column('Quantity In', 'quantity_in'),
+    Column('Quantity Out', 'quantity_out'),
+    Column('Price', 'price', number_format=CURRENCY_FORMAT),
+    Column('Total Amount', 'total_amount', number_format=CURRENCY_FORMAT),
+    Column('Delivery Ref', 'delivery_ref'),
+    Column('Delivery No.', 'delivery_no'),
+    Column('Invoice Type', 'invoice_type'),
+    Column('Invoice#', 'invoice_no'),
+], header_fill=GOLD_FILL)
+
+STOCK_IN_RECORDS_SHEET = SheetSpec('Stock In Records', [
+    Column('Date', 'date', formatter=format_date),
+    Column('PO Number', 'po_number'),
+    Column('Purchaser', 'purchaser'),
+    Column('Item Code', 'item_code'),
+    Column('Particular', 'particulars'),
+    Column('Quantity In', 'quantity_in', number_format=CURRENCY_FORMAT),
+    Column('Unit', 'unit'),
+    Column('FBBD Ref#', 'fbbd_ref_number'),
+    Column('Remarks', 'remarks'),
+    Column('Supplier', 'supplier'),
+    Column('Delivery Ref#', 'delivery_ref'),
+    Column('Delivery No.', 'delivery_no'),
+    Column('Invoice Type', 'invoice_type'),
+    Column('Invoice No.', 'invoice_no'),
+    Column('Payment Req Ref#', 'payment_req_ref'),
+    Column('Payment Details', 'payment_details'),
+    Column('Remarks2', 'remarks2'),
+])
+
+STOCK_IN_HISTORY_SHEET = SheetSpec('Stock In Transaction History', [
+    Column('Date', 'date', formatter=format_date),
+    Column('PO#', 'po_number'),
+    Column('Purchaser', 'purchaser'),
+    Column('Item Code', 'item_code'),
+    Column('Particular', 'particulars'),
+    Column('Unit', 'unit'),
+    Column('Quantity In', 'quantity_in'),
+    Column('Supplier', 'supplier'),
+    Column('Remarks', 'remarks'),
+    Column('Invoice No.', 'invoice_no'),
+    Column('Invoice Type', 'invoice_type'),
+], header_font=WHITE_BOLD_FONT, header_fill=BLACK_FILL)
+
+
+def write_workbook(fileobj, spec, rows):
+    formatters = [column.formatter for column in spec.columns]
+
+    def format_row(row):
+        return [formatter(value) if formatter else value for formatter, value in zip(formatters, row)]
+
+    rows = iter(rows)
+    sample = [format_row(row) for row in islice(rows, WIDTH_SAMPLE_SIZE)]
+
+    headers = [column.header.upper() if spec.upper_headers else column.header for column in spec.columns]
+    widths = [len(header) for header in headers]
+    for row in sample:
+        for index, value in enumerate(row):
+            if value is not None and len(str(value)) > widths[index]:
+                widths[index] = len(str(value))
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(spec.title)
+    for index, width in enumerate(widths, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width + 2  # Extra space for visibility
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(sheet, value=header)
+        cell.font = spec.header_font
+        cell.fill = spec.header_fill
+        header_cells.append(cell)
+    sheet.append(header_cells)
+
+    formatted = [(index, column.number_format) for index, column in enumerate(spec.columns) if column.number_format]
+    for row in chain(sample, map(format_row, rows)):
+        for index, number_format in formatted:
+            cell = WriteOnlyCell(sheet, value=row[index])
+            cell.number_format = number_format
+            row[index] = cell
+        sheet.append(row)
+
+    workbook.save(fileobj)
+
+
+def write_workbook_file(path, spec, rows):
+    # Module level so it can be handed to a process pool; spec and rows must be picklable
+    with open(path, 'wb') as workbook_file:
+        write_workbook(workbook_file, spec, rows)
+    return path
+
+
+def write_archive(fileobj, entries):
+    # entries yields (file name inside the zip, SheetSpec, rows)
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for arcname, spec, rows in entries:
+            with tempfile.TemporaryFile() as workbook_file:
+                write_workbook(workbook_file, spec, rows)
+                workbook_file.seek(0)
+                with zf.open(arcname, 'w') as member:
+                    while True:
+                        block = workbook_file.read(STREAM_BLOCK_SIZE)
+                        if not block:
+                            break
+                        member.write(block)
+
+
+def stream_file(fileobj):
+    try:
+        fileobj.seek(0)
+        while True:
+            block = fileobj.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+    finally:
+        fileobj.close()
+
+
+def _streaming_attachment(stream, filename, content_type):
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def xlsx_response(filename, spec, queryset):
+    def generate():
+        # The workbook is written to a temporary file on the first iteration, not when the view returns,
+        # and then sent in STREAM_BLOCK_SIZE chunks instead of as one bytes object.
+        workbook_file = tempfile.TemporaryFile()
+        write_workbook(workbook_file, spec, spec.rows(queryset))
+        yield from stream_file(workbook_file)
+
+    return _streaming_attachment(generate(), filename, XLSX_CONTENT_TYPE)
+
+
+def zip_response(filename, entries):
+    def generate():
+        archive_file = tempfile.TemporaryFile()
+        write_archive(archive_file, entries)
+        yield from stream_file(archive_file)
+
+    return _streaming_attachment(generate(), filename, ZIP_CONTENT_TYPE)
@@ -0,0 +1,60 @@
+import logging
+
+from .imports import resolve_folders
+from .models import PurchaseOrder
+from .rollups import FOLDER_FIELDS, folders_of, recompute_rollups
+from .shops import PO_SHOP
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+
+def folder_links(shop):
+    # (label, model, column holding the name, folder FK): rows are filed into the folder whose name
+    # equals the column's value
+    links = [
+        ('stock in', shop.stock_in_history, 'supplier', 'supplier_folder'),
+        ('site deliveries', shop.inventory_history, 'site_delivered', 'site_inventory_folder'),
+        ('client deliveries', shop.inventory_history, 'client', 'client_inventory_folder'),
+    ]
+    if shop is PO_SHOP:
+        links.insert(0, ('purchase orders', PurchaseOrder, 'supplier', 'supplier_folder'))
+    return links
+
+
+def assign_folder(queryset, folder_field, folder, batch_size=BATCH_SIZE):
+    # Points every row of queryset at folder with UPDATE ... WHERE id IN (...), batch_size ids at a time,
+    # instead of loading and save()-ing each row. Rows already in the folder are skipped, so running it
+    # again costs one SELECT. Returns the number of rows moved.
+    model = queryset.model
+    pending = queryset.exclude(**{folder_field: folder}).order_by()
+    rolled_up = folder_field in FOLDER_FIELDS  # Folder totals of the rows' old and new folders are recounted
+    touched = {folder.pk}
+    updated = 0
+    while True:
+        ids = list(pending.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        if rolled_up:
+            touched |= folders_of(model, folder_field, ids)
+        updated += model.objects.filter(id__in=ids).update(**{folder_field: folder})
+    if rolled_up and updated:
+        recompute_rollups(model, folder_field, touched)
+    return updated
+
+
+def sync_folders(shop, create_missing=False, batch_size=BATCH_SIZE):
+    # Full re-sync: files every row into the folder named after it. With create_missing, names without a
+    # folder get one first. Returns {label: rows moved}.
+    moved = {}
+    for label, model, name_field, folder_field in folder_links(shop):
+        folder_model = model._meta.get_field(folder_field).related_model
+        if create_missing:
+            resolve_folders(folder_model, model.objects.values_list(name_field, flat=True).distinct())
+        moved[label] = 0
+        for folder in folder_model.objects.all():
+            moved[label] += assign_folder(model.objects.filter(**{name_field: folder.name}), folder_field, folder,
+                                          batch_size)
+        logger.info('Folder sync %s %s: %d row(s) moved', shop, label, moved[label])
+    return moved
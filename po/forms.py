@@ -1,7 +1,36 @@
 from django import forms
 from django.core.exceptions import ValidationError
 
+from .catalog import product_names
 from .models import PurchaseOrder, ItemInventory, StockInHistory, InventoryHistory
+from .shops import PO_SHOP
+
+
+class ProductNameSelect(forms.Select):
+    # Renders only the selected option; the page fetches the others from the typeahead endpoint as the
+    # user types, instead of every form carrying the whole catalog
+    def optgroups(self, name, value, attrs=None):
+        self.choices = [('', '')] + [(v, v) for v in value if v]
+        return super().optgroups(name, value, attrs)
+
+
+class ProductNameField(forms.CharField):
+    # A product name from the shop's inventory, checked against the cached catalog (po/catalog.py) when the
+    # form is validated rather than queried when the module is imported
+    widget = ProductNameSelect
+    default_error_messages = {
+        'invalid_choice': 'Select a valid choice. %(value)s is not one of the available choices.',
+    }
+
+    def __init__(self, shop, **kwargs):
+        self.shop = shop
+        super().__init__(**kwargs)
+
+    def validate(self, value):
+        super().validate(value)
+        if value and value not in product_names(self.shop):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                  params={'value': value})
 
 
 class PurchaseOrderForm(forms.ModelForm):
@@ -328,9 +357,9 @@ class ItemInventoryBulkForm(forms.ModelForm):
 
 
 class StockInHistoryForm(forms.ModelForm):
-    particulars = forms.ChoiceField(
-        choices=[(p, p) for p in ItemInventory.objects.values_list('po_product_name', flat=True).distinct()],
-        widget=forms.Select(attrs={'class': 'form-control select2', 'id': 'id_particulars'}),
+    particulars = ProductNameField(
+        PO_SHOP,
+        widget=ProductNameSelect(attrs={'class': 'form-control select2', 'id': 'id_particulars'}),
         required=True,
         label='Particulars'
     )
@@ -374,10 +403,3 @@ class StockInHistoryForm(forms.ModelForm):
             'payment_details': forms.Select(attrs={'class': 'form-control'}),
             'remarks2': forms.Select(attrs={'class': 'form-control'})
         }
-
-    def __init__(self, *args, **kwargs):
-        super(StockInHistoryForm, self).__init__(*args, **kwargs)
-        # Dynamically update the queryset for 'particulars'
-        self.fields['particulars'].queryset = ItemInventory.objects.values_list('po_product_name', flat=True).distinct()
-
-
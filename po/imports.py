@@ -0,0 +1,325 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+import pandas as pd
+from django.db import models, transaction
+
+from openpyxl import load_workbook
+
+from .catalog import catalog_changed, sync_item_codes
+from .ledger import apply_deltas
+from .models import PurchaseOrder, SupplierFolder
+from .search import build_search_text
+
+# Rows are inserted in batches of this size
+BATCH_SIZE = 1000
+# Uploads are read and imported this many rows at a time, so memory stays flat however big the sheet is
+CHUNK_SIZE = 5000
+# Excel rows are 1-based and the first one holds the headers
+FIRST_DATA_ROW = 2
+
+# Sheet header -> model field
+PURCHASE_ORDER_COLUMNS = [
+    ('DATE', 'date'),
+    ('PO NUMBER', 'po_number'),
+    ('PURCHASER', 'purchaser'),
+    ('BRAND', 'brand'),
+    ('ITEM CODE', 'item_code'),
+    ('PARTICULAR', 'particulars'),
+    ('QTY', 'quantity'),
+    ('UNIT', 'unit'),
+    ('PRICE', 'price'),
+    ('T. AMOUNT', 'total_amount'),
+    ('SITE DELIVERED', 'site_delivered'),
+    ('FBBD REF#', 'fbbd_ref_number'),
+    ('REMARKS', 'remarks'),
+    ('SUPPLIER', 'supplier'),
+    ('DELIVERY REF#', 'delivery_ref'),
+    ('DELIVERY NO.', 'delivery_no'),
+    ('INVOICE TYPE', 'invoice_type'),
+    ('INVOICE NO.', 'invoice_no'),
+    ('PAYMENT REQ REF#', 'payment_req_ref'),
+    ('PAYMENT DETAILS', 'payment_details'),
+    ('REMARKS2', 'remarks2'),
+]
+
+STOCK_IN_COLUMNS = [
+    ('DATE', 'date'),
+    ('PO NUMBER', 'po_number'),
+    ('PURCHASER', 'purchaser'),
+    ('ITEM CODE', 'item_code'),
+    ('PARTICULAR', 'particulars'),
+    ('QUANTITY IN', 'quantity_in'),
+    ('UNIT', 'unit'),
+    ('SUPPLIER', 'supplier'),
+    ('DELIVERY REF#', 'delivery_ref'),
+    ('DELIVERY NO.', 'delivery_no'),
+    ('INVOICE TYPE', 'invoice_type'),
+    ('INVOICE NO.', 'invoice_no'),
+    ('PAYMENT REQ REF#', 'payment_req_ref'),
+    ('PAYMENT DETAILS', 'payment_details'),
+    ('REMARKS', 'remarks'),
+    ('REMARKS2', 'remarks2'),
+]
+
+# A stock-in row is added to the inventory item with the same values for these
+# (stock-in field, inventory field) pairs
+INVENTORY_KEY = [
+    ('item_code', 'item_code'),
+    ('supplier', 'supplier'),
+    ('particulars', 'po_product_name'),
+    ('unit', 'unit'),
+]
+
+
+def _is_empty_row(row):
+    return all(value is None or (isinstance(value, str) and not value.strip()) for value in row)
+
+
+def read_upload(f, chunk_size=CHUNK_SIZE):
+    # Yields the uploaded sheet as DataFrames of at most chunk_size rows. Each frame is indexed by the
+    # row's position below the header, so error reports keep pointing at the right spreadsheet row.
+    if getattr(f, 'name', '').lower().endswith('.csv'):
+        for chunk in pd.read_csv(f, dtype=object, chunksize=chunk_size, encoding='utf-8-sig',
+                                 skip_blank_lines=False):
+            yield chunk.dropna(how='all')
+        return
+
+    # Read-only mode walks the sheet XML lazily instead of loading every cell
+    workbook = load_workbook(f, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        headers = ['' if value is None else str(value).strip() for value in header]
+        width = len(headers)
+
+        batch, index = [], []
+        for position, row in enumerate(rows):
+            if _is_empty_row(row):
+                continue
+            batch.append(tuple(row[:width]) + (None,) * (width - len(row)))
+            index.append(position)
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=headers, index=index, dtype=object)
+                batch, index = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=headers, index=index, dtype=object)
+    finally:
+        workbook.close()
+
+
+def _to_text(value):
+    if value is None or value != value:  # None or NaN
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # Whole numbers come out of Excel as floats ("1234.0") in columns that also hold blanks
+        return str(int(value))
+    return str(value).strip()
+
+
+def _is_blank(series):
+    return series.map(_to_text) == ''
+
+
+def _coerce_text(series, field):
+    text = series.map(_to_text).astype(object)
+    invalid = pd.Series(False, index=series.index)
+    if isinstance(field, models.CharField) and field.max_length:
+        invalid = text.map(len) > field.max_length
+    return text, invalid, f'Longer than {field.max_length} characters.'
+
+
+def _coerce_date(series, field):
+    dates = pd.to_datetime(series, errors='coerce', format='mixed')
+    values = dates.dt.date.astype(object).where(dates.notna(), None)
+    return values, dates.isna() & ~_is_blank(series), 'Not a valid date.'
+
+
+def _coerce_integer(series, field):
+    numbers = pd.to_numeric(series, errors='coerce')
+    invalid = (numbers.isna() | (numbers % 1 != 0)) & ~_is_blank(series)
+    # Built as an object Series directly: map() would let pandas turn the ints back into floats and None into NaN
+    values = pd.Series([None if pd.isna(value) else int(value) for value in numbers.where(~invalid)],
+                       index=series.index, dtype=object)
+    return values, invalid, 'Not a whole number.'
+
+
+def _coerce_decimal(series, field):
+    numbers = pd.to_numeric(series, errors='coerce')
+    limit = 10 ** (field.max_digits - field.decimal_places)
+    invalid = (numbers.isna() | (numbers.abs() >= limit)) & ~_is_blank(series)
+    quantum = Decimal(1).scaleb(-field.decimal_places)
+    values = numbers.where(numbers.notna() & ~invalid).astype(object)
+    values = values.map(lambda value: None if pd.isna(value) else Decimal(str(value)).quantize(quantum, ROUND_HALF_UP))
+    return values, invalid, f'Not a valid amount (up to {field.max_digits - field.decimal_places} digits).'
+
+
+def _coercer(field):
+    if isinstance(field, models.DateField):
+        return _coerce_date
+    if isinstance(field, models.DecimalField):
+        return _coerce_decimal
+    if isinstance(field, models.IntegerField):
+        return _coerce_integer
+    return _coerce_text
+
+
+def coerce_frame(df, model, columns, first_row=FIRST_DATA_ROW):
+    # Maps sheet headers to model fields and converts every column to its field's type in one pass.
+    # Rows with a bad cell are dropped and reported instead of aborting the whole upload.
+    df = df.rename(columns=lambda header: str(header).strip())
+    clean = pd.DataFrame(index=df.index)
+    bad_rows = pd.Series(False, index=df.index)
+    errors = []
+
+    for header, field_name in columns:
+        field = model._meta.get_field(field_name)
+        raw = df[header] if header in df.columns else pd.Series(None, index=df.index, dtype=object)
+        values, invalid, message = _coercer(field)(raw, field)
+        clean[field_name] = values
+        bad_rows |= invalid
+        for index in invalid[invalid].index:
+            errors.append({'row': int(index) + first_row, 'column': header, 'value': str(raw[index]),
+                           'message': message})
+
+    errors.sort(key=lambda error: error['row'])
+    return clean[~bad_rows], errors
+
+
+def skipped_rows(errors):
+    return len({error['row'] for error in errors})
+
+
+def stock_in_message(summary, errors):
+    message = (f"{summary['rows']} stock-in row(s) imported: {summary['updated_items']} item(s) restocked, "
+               f"{summary['new_items']} new item(s).")
+    if errors:
+        message += f' {skipped_rows(errors)} row(s) were skipped.'
+    return message
+
+
+def resolve_folders(folder_model, names, folders=None):
+    # One lookup for every distinct name, one insert for the ones that don't have a folder yet.
+    # Pass the dict from a previous call to skip names that are already resolved.
+    folders = {} if folders is None else folders
+    names = {name for name in names if name} - folders.keys()
+    if not names:
+        return folders
+    folders.update(folder_model.objects.in_bulk(names, field_name='name'))
+    missing = names - folders.keys()
+    if missing:
+        folder_model.objects.bulk_create([folder_model(name=name) for name in missing], ignore_conflicts=True)
+        folders.update(folder_model.objects.in_bulk(missing, field_name='name'))
+    return folders
+
+
+def import_purchase_orders(f):
+    created, errors, folders = 0, [], {}
+
+    with transaction.atomic():
+        for chunk in read_upload(f):
+            rows, chunk_errors = coerce_frame(chunk, PurchaseOrder, PURCHASE_ORDER_COLUMNS)
+            errors.extend(chunk_errors)
+            resolve_folders(SupplierFolder, rows['supplier'].unique(), folders)
+            orders = [
+                PurchaseOrder(supplier_folder=folders.get(record['supplier']), **record)
+                for record in rows.to_dict('records')
+            ]
+            # bulk_create skips save(), which normally fills search_text
+            for order in orders:
+                order.search_text = build_search_text(order)
+            PurchaseOrder.objects.bulk_create(orders, batch_size=BATCH_SIZE)
+            created += len(orders)
+
+    return created, errors
+
+
+def _check_inventory_lengths(rows, inventory_model, columns):
+    # Inventory key fields are shorter than their stock-in columns; new items must still fit
+    headers = {field_name: header for header, field_name in columns}
+    bad_rows = pd.Series(False, index=rows.index)
+    errors = []
+    for field_name, inventory_field in INVENTORY_KEY:
+        max_length = inventory_model._meta.get_field(inventory_field).max_length
+        too_long = rows[field_name].str.len() > max_length
+        bad_rows |= too_long
+        for index in too_long[too_long].index:
+            errors.append({'row': int(index) + FIRST_DATA_ROW, 'column': headers[field_name],
+                           'value': rows.at[index, field_name], 'message': f'Longer than {max_length} characters.'})
+    return rows[~bad_rows], errors
+
+
+def import_stock_in(f, shop):
+    errors, folders = [], {}
+    imported, updated_keys, new_keys = 0, set(), set()
+
+    with transaction.atomic():
+        for chunk in read_upload(f):
+            rows, chunk_errors = coerce_frame(chunk, shop.stock_in_history, STOCK_IN_COLUMNS)
+            rows, length_errors = _check_inventory_lengths(rows, shop.item_inventory, STOCK_IN_COLUMNS)
+            errors.extend(sorted(chunk_errors + length_errors, key=lambda error: error['row']))
+
+            updated, created = _apply_stock_in_rows(rows, shop)
+            updated_keys |= updated
+            new_keys |= created
+
+            resolve_folders(shop.inventory_supplier_folder, rows['supplier'].unique(), folders)
+            history = [
+                shop.stock_in_history(supplier_folder=folders.get(record['supplier']), **record)
+                for record in rows.to_dict('records')
+            ]
+            shop.stock_in_history.objects.bulk_create(history, batch_size=BATCH_SIZE)
+            imported += len(history)
+
+    # Items created by an earlier chunk and topped up by a later one still count as new
+    return {'rows': imported, 'updated_items': len(updated_keys - new_keys), 'new_items': len(new_keys)}, errors
+
+
+def _apply_stock_in_rows(rows, shop):
+    key_fields = [field_name for field_name, _ in INVENTORY_KEY]
+    inventory_fields = [inventory_field for _, inventory_field in INVENTORY_KEY]
+
+    # Summed quantity per inventory key; blank quantities add nothing
+    totals = rows.assign(quantity_in=rows['quantity_in'].map(lambda value: value or Decimal('0.00'))) \
+        .groupby(key_fields, sort=False)['quantity_in'].sum()
+    first_rows = {tuple(record[field] for field in key_fields): record
+                  for record in rows.drop_duplicates(key_fields).to_dict('records')}
+
+    # Existing items for these keys; when several share a key the oldest one gets the stock
+    existing = {}
+    candidates = shop.item_inventory.objects.filter(po_product_name__in=rows['particulars'].unique()) \
+        .order_by('id').values_list('id', *inventory_fields)
+    for item_id, *key in candidates:
+        existing.setdefault(tuple(key), item_id)
+
+    deltas = {}
+    new_items = []
+    for key, quantity in totals.items():
+        if key in existing:
+            deltas[existing[key]] = quantity
+            continue
+        first = first_rows[key]
+        new_items.append(shop.item_inventory(
+            **dict(zip(inventory_fields, key)),
+            quantity_in=quantity,
+            quantity_out=0,  # New stock-in, no items taken out yet
+            stock=quantity,  # Stock is initially the quantity in
+            delivery_ref=first['delivery_ref'],
+            delivery_no=first['delivery_no'],
+            invoice_type=first['invoice_type'],
+            invoice_no=first['invoice_no'],
+        ))
+
+    apply_deltas(shop, quantity_in=deltas)
+    shop.item_inventory.objects.bulk_create(new_items, batch_size=BATCH_SIZE)
+    # bulk_create skips post_save, so register the new items' codes and names here
+    sync_item_codes(shop, [(item.item_code, item.po_product_name, item.unit) for item in new_items])
+    if new_items:
+        # The new ids are only known where bulk_create returns them (not on MySQL); without them feed clients
+        # reload the whole catalog
+        ids = [item.pk for item in new_items]
+        catalog_changed(shop, ids if None not in ids else None)
+
+    updated_keys = {key for key in totals.index if key in existing}
+    return updated_keys, set(totals.index) - updated_keys
@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import F, Q, Value
+
+from .query import apply_date_filter, apply_search
+from .search import INVENTORY_HISTORY_SEARCH, STOCK_IN_HISTORY_SEARCH, SUPPLIER_STOCK_IN_SEARCH
+from .shops import SHOPS
+
+# Inventory queries of the po and Juban views, written once against a Shop, plus the cross-shop ones.
+
+INVENTORY_SEARCH_FIELDS = ['item_code', 'supplier', 'po_product_name', 'unit', 'quantity_in', 'quantity_out', 'stock']
+CONSOLIDATED_LIMIT = 200
+
+
+def inventory_items(shop, query=None):
+    # The inventory table: every item by name, narrowed by ?q= over the listed columns
+    items = shop.item_inventory.objects.order_by('po_product_name')
+    if query:
+        condition = Q()
+        for field in INVENTORY_SEARCH_FIELDS:
+            condition |= Q(**{f'{field}__icontains': query})
+        items = items.filter(condition)
+    return items
+
+
+def stock_outs(shop, query=None, date_query=None):
+    # The transaction history, newest first; its page searches ?q=, its export also narrows by ?date=
+    transactions = shop.inventory_history.objects.exclude(date__isnull=True).order_by('-date')
+    transactions = apply_search(transactions, query, INVENTORY_HISTORY_SEARCH)
+    return apply_date_filter(transactions, date_query)
+
+
+def stock_ins(shop, query=None, date_query=None):
+    # The stock-in transaction history, as stock_outs
+    transactions = shop.stock_in_history.objects.exclude(date__isnull=True).order_by('-date')
+    transactions = apply_search(transactions, query, STOCK_IN_HISTORY_SEARCH)
+    return apply_date_filter(transactions, date_query)
+
+
+def supplier_stock_ins(shop, folder, query=None):
+    # A supplier folder's stock-ins
+    return apply_search(shop.stock_in_history.objects.filter(supplier_folder=folder), query,
+                        SUPPLIER_STOCK_IN_SEARCH)
+
+
+def name_taken(shop, po_product_name):
+    return shop.item_inventory.objects.filter(po_product_name=po_product_name).exists()
+
+
+def matching_item(shop, item):
+    # Another item with item's supplier and name, which an edit merges into
+    return shop.item_inventory.objects.filter(supplier=item.supplier, po_product_name=item.po_product_name) \
+        .exclude(id=item.id).first()
+
+
+def consolidated_stock(query=None, after=None, limit=CONSOLIDATED_LIMIT, shops=SHOPS):
+    # Stock per product name across shops as one statement: the shops' items are combined with UNION ALL
+    # and summed per name in the database, instead of scanning each shop and merging in Python.
+    # Returns [{'po_product_name', 'stock': {shop name: stock}, 'total'}] by name, limit names after after.
+    parts = []
+    for shop in shops:
+        items = shop.item_inventory.objects.exclude(po_product_name__isnull=True).exclude(po_product_name='')
+        if query:
+            items = items.filter(po_product_name__icontains=query)
+        if after:
+            items = items.filter(po_product_name__gt=after)
+        parts.append(items.order_by().annotate(name=F('po_product_name'), shop_name=Value(shop.name),
+                                               quantity=F('stock')).values_list('name', 'shop_name', 'quantity'))
+    combined = parts[0].union(*parts[1:], all=True)
+    sql, params = combined.query.sql_with_params()
+
+    connection = connections[combined.db]
+    name, shop_name, quantity = map(connection.ops.quote_name, ('name', 'shop_name', 'quantity'))
+    per_shop = ', '.join(f'SUM(CASE WHEN {shop_name} = %s THEN {quantity} ELSE 0 END)' for _ in shops)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT {name}, {per_shop}, SUM({quantity}) FROM ({sql}) combined '
+            f'GROUP BY {name} ORDER BY {name} LIMIT %s',
+            [*(shop.name for shop in shops), *params, limit])
+        rows = cursor.fetchall()
+
+    def decimal(value):
+        # SQLite hands sums back as floats
+        return Decimal(str(value)).quantize(Decimal('0.01')) if value is not None else Decimal('0.00')
+
+    return [{'po_product_name': row[0],
+             'stock': {shop.name: decimal(value) for shop, value in zip(shops, row[1:-1])},
+             'total': decimal(row[-1])}
+            for row in rows]
@@ -0,0 +1,268 @@
+import logging
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from .exports import write_workbook_file, PURCHASE_ORDER_SHEET, SITE_FOLDER_SHEET, CLIENT_FOLDER_SHEET
+from .models import ExportJob, PurchaseOrder, SupplierFolder, InventoryHistory, SiteInventoryFolder, \
+    ClientInventoryFolder
+
+logger = logging.getLogger(__name__)
+
+# 'thread' runs jobs on a pool inside the web process; 'worker' leaves them pending for
+# the run_export_jobs management command
+JOB_RUNNER = getattr(settings, 'EXPORT_JOB_RUNNER', 'thread')
+JOB_WORKERS = getattr(settings, 'EXPORT_JOB_WORKERS', 2)
+FOLDER_WORKERS = getattr(settings, 'EXPORT_FOLDER_WORKERS', 4)
+# How folder workbooks are built: 'serial', 'thread' or 'process' (spreads them over several cores)
+FOLDER_POOL = getattr(settings, 'EXPORT_FOLDER_POOL', 'thread')
+EXPORT_DIR = getattr(settings, 'EXPORT_JOB_DIR', os.path.join(settings.MEDIA_ROOT, 'exports'))
+# Jobs outlive the runner that claimed them (a restart drops the thread pool's queue and whatever it was
+# building): running jobs without progress for STALE_SECONDS are requeued, up to MAX_ATTEMPTS runs, and
+# with the thread runner jobs pending for PENDING_SECONDS are handed to the pool again
+STALE_SECONDS = getattr(settings, 'EXPORT_JOB_STALE_SECONDS', 1800)
+MAX_ATTEMPTS = getattr(settings, 'EXPORT_JOB_MAX_ATTEMPTS', 2)
+PENDING_SECONDS = getattr(settings, 'EXPORT_JOB_PENDING_SECONDS', 60)
+
+
+class FolderArchive:
+    def __init__(self, kind, download_name, folders, entry):
+        self.kind = kind
+        self.download_name = download_name
+        self.folders = folders  # Callable returning the folders to export
+        self.entry = entry  # Callable mapping a folder to (file name in zip, SheetSpec, queryset)
+
+    def task(self, folder):
+        arcname, spec, queryset = self.entry(folder)
+        return arcname, spec, partial(spec.rows, queryset)
+
+
+ARCHIVES = {}
+
+
+def register_archive(archive):
+    ARCHIVES[archive.kind] = archive
+    return archive
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='export-job')
+        # A fresh pool means this process (re)started: pick up what a previous one left behind
+        _executor.submit(_resume_in_pool)
+    return _executor
+
+
+def enqueue_export(kind):
+    archive = ARCHIVES[kind]
+    job = ExportJob.objects.create(kind=kind, file_name=archive.download_name)
+    if JOB_RUNNER == 'thread':
+        # Only hand the job to the pool once its row is visible to other connections
+        transaction.on_commit(lambda: _get_executor().submit(run_job, job.id))
+    return job
+
+
+def start_export_job(kind):
+    # The Export All views' reply: the page polls status_url until the archive can be downloaded
+    job = enqueue_export(kind)
+    return JsonResponse({'success': True, 'job_id': job.id,
+                         'status_url': reverse('export_job_status', args=[job.id])})
+
+
+def run_job(job_id):
+    try:
+        # Claim the job first so two runners never build the same archive
+        if not ExportJob.objects.filter(id=job_id, status='pending').update(
+                status='running', attempts=F('attempts') + 1, heartbeat_at=timezone.now()):
+            return
+        job = ExportJob.objects.get(id=job_id)
+        try:
+            path = build_archive(job)
+        except Exception as e:
+            logger.exception('Export job %s failed', job_id)
+            ExportJob.objects.filter(id=job_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        else:
+            ExportJob.objects.filter(id=job_id).update(status='done', file_path=path, finished_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def recover_jobs():
+    # Requeues running jobs whose runner stopped reporting progress, or fails them once they've had
+    # MAX_ATTEMPTS runs. Returns (requeued, failed).
+    now = timezone.now()
+    stale = ExportJob.objects.filter(Q(heartbeat_at__lt=now - timedelta(seconds=STALE_SECONDS)) |
+                                     Q(heartbeat_at__isnull=True), status='running')
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status='failed', error='The export was interrupted.', finished_at=now)
+    requeued = stale.update(status='pending', processed_folders=0, heartbeat_at=None)
+    if requeued or failed:
+        logger.warning('Export jobs: %d interrupted job(s) requeued, %d failed', requeued, failed)
+    return requeued, failed
+
+
+def resume_jobs():
+    # Thread runner: recovers interrupted jobs and hands the pool every job pending for PENDING_SECONDS,
+    # whose submit was lost. A job already queued elsewhere is harmless: only one run can claim it.
+    recover_jobs()
+    cutoff = timezone.now() - timedelta(seconds=PENDING_SECONDS)
+    job_ids = list(ExportJob.objects.filter(status='pending', created_at__lt=cutoff).order_by('created_at')
+                   .values_list('id', flat=True))
+    for job_id in job_ids:
+        _get_executor().submit(run_job, job_id)
+    return len(job_ids)
+
+
+def _resume_in_pool():
+    try:
+        resume_jobs()
+    finally:
+        connection.close()
+
+
+def is_stalled(job):
+    # True when a polled job looks abandoned (see resume_jobs); checks the row as loaded, no queries
+    now = timezone.now()
+    if job.status == 'running':
+        return job.heartbeat_at is None or job.heartbeat_at < now - timedelta(seconds=STALE_SECONDS)
+    return job.status == 'pending' and job.created_at < now - timedelta(seconds=PENDING_SECONDS)
+
+
+def revive_job(job):
+    # Called while a page polls the job, so it never waits on a job nobody is building
+    if JOB_RUNNER == 'thread' and is_stalled(job):
+        resume_jobs()
+        job.refresh_from_db()
+    return job
+
+
+def run_pending_jobs():
+    recover_jobs()
+    job_ids = list(ExportJob.objects.filter(status='pending').order_by('created_at').values_list('id', flat=True))
+    for job_id in job_ids:
+        run_job(job_id)
+    return len(job_ids)
+
+
+def build_archive(job):
+    archive = ARCHIVES[job.kind]
+    folders = list(archive.folders())
+    ExportJob.objects.filter(id=job.id).update(total_folders=len(folders), heartbeat_at=timezone.now())
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, f'{job.id}_{job.file_name}')
+    partial_path = path + '.part'
+
+    try:
+        with tempfile.TemporaryDirectory(dir=EXPORT_DIR) as work_dir:
+            tasks = (archive.task(folder) for folder in folders)
+            write_zip(partial_path, build_workbooks(tasks, work_dir),
+                      progress=lambda processed: ExportJob.objects.filter(id=job.id).update(
+                          processed_folders=processed, heartbeat_at=timezone.now()))
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+    os.replace(partial_path, path)
+    return path
+
+
+def write_zip(path, workbooks, progress=None):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        # Each workbook is added to the zip as soon as it is ready, in completion order
+        for processed, (arcname, workbook_path) in enumerate(workbooks, start=1):
+            zf.write(workbook_path, arcname)
+            os.remove(workbook_path)
+            if progress:
+                progress(processed)
+
+
+def build_workbooks(tasks, work_dir, pool=None, workers=None):
+    # tasks yields (file name in zip, SheetSpec, load_rows); yields (file name in zip, workbook path)
+    # as each workbook is finished
+    pool = pool or FOLDER_POOL
+    workers = workers or FOLDER_WORKERS
+
+    if pool == 'serial':
+        for arcname, spec, load_rows in tasks:
+            yield arcname, write_workbook_file(_workbook_path(work_dir), spec, load_rows())
+        return
+
+    if pool == 'process':
+        # Rows are fetched here and shipped to the workers as plain tuples; the workers never
+        # touch the database. 'spawn' keeps the children clear of the parent's threads and sockets.
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+        def submit(spec, load_rows):
+            return executor.submit(write_workbook_file, _workbook_path(work_dir), spec, list(load_rows()))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='export-folder')
+
+        def submit(spec, load_rows):
+            return executor.submit(_write_folder_workbook, _workbook_path(work_dir), spec, load_rows)
+
+    with executor:
+        pending = {}
+        for arcname, spec, load_rows in tasks:
+            # Keep only a couple of folders per worker in flight so fetched rows don't pile up
+            if len(pending) >= workers * 2:
+                yield from _collect(pending, FIRST_COMPLETED)
+            pending[submit(spec, load_rows)] = arcname
+        while pending:
+            yield from _collect(pending, FIRST_COMPLETED)
+
+
+def _collect(pending, return_when):
+    done, _ = wait(pending, return_when=return_when)
+    for future in done:
+        arcname = pending.pop(future)
+        yield arcname, future.result()
+
+
+def _workbook_path(work_dir):
+    fd, path = tempfile.mkstemp(suffix='.xlsx', dir=work_dir)
+    os.close(fd)
+    return path
+
+
+def _write_folder_workbook(path, spec, load_rows):
+    try:
+        return write_workbook_file(path, spec, load_rows())
+    finally:
+        # Pool threads get their own connection; don't leave it open after the task
+        connection.close()
+
+
+register_archive(FolderArchive(
+    'supplier_folders', 'supplier_orders.zip', SupplierFolder.objects.all,
+    lambda folder: (f'SupplierOrders_{folder.name}.xlsx', PURCHASE_ORDER_SHEET.with_title('Supplier Orders'),
+                    PurchaseOrder.objects.filter(supplier_folder=folder))
+))
+
+register_archive(FolderArchive(
+    'site_folders', 'site_inventory_folders.zip', SiteInventoryFolder.objects.all,
+    lambda folder: (f'SiteInventoryRecords_{folder.name}.xlsx', SITE_FOLDER_SHEET,
+                    InventoryHistory.objects.filter(site_inventory_folder=folder))
+))
+
+register_archive(FolderArchive(
+    'client_folders', 'client_inventory_folders.zip', ClientInventoryFolder.objects.all,
+    lambda folder: (f'ClientInventory_{folder.name}.xlsx', CLIENT_FOLDER_SHEET,
+                    InventoryHistory.objects.filter(client_inventory_folder=folder))
+))
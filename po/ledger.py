@@ -0,0 +1,85 @@
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+# quantity_in, quantity_out and stock are only ever written through this module. Quantities change
+# with UPDATE ... SET quantity = quantity + delta and stock is recomputed from them in the database,
+# so two clerks moving the same item at the same time can't overwrite each other's changes.
+STOCK_FIELDS = ('quantity_in', 'quantity_out', 'stock')
+
+QUANTITY = models.DecimalField(max_digits=10, decimal_places=2)
+
+
+def _stock():
+    return Coalesce(F('quantity_in'), Value(0)) - Coalesce(F('quantity_out'), Value(0))
+
+
+def _added(field, deltas, ids):
+    delta = Case(*[When(id=item_id, then=Value(deltas[item_id])) for item_id in ids if item_id in deltas],
+                 default=Value(0), output_field=QUANTITY)
+    return Coalesce(F(field), Value(0)) + delta
+
+
+def recompute_stock(queryset):
+    # A separate UPDATE because MySQL evaluates SET clauses left to right while other backends don't
+    return queryset.update(stock=_stock())
+
+
+def apply_deltas(shop, quantity_in=None, quantity_out=None):
+    # quantity_in / quantity_out map inventory id -> amount to add. Rows are updated in id order so
+    # concurrent callers lock them in the same order, and each batch is one short transaction.
+    quantity_in, quantity_out = quantity_in or {}, quantity_out or {}
+    ids = sorted(set(quantity_in) | set(quantity_out))
+    updated = 0
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        changes = {}
+        if quantity_in:
+            changes['quantity_in'] = _added('quantity_in', quantity_in, batch)
+        if quantity_out:
+            changes['quantity_out'] = _added('quantity_out', quantity_out, batch)
+        with transaction.atomic():
+            rows = shop.item_inventory.objects.filter(id__in=batch)
+            updated += rows.update(**changes)
+            recompute_stock(rows)
+    return updated
+
+
+def save_details(item):
+    # Saves every other column of an inventory item, leaving the quantities to the ledger
+    item.save(update_fields=[field.name for field in item._meta.concrete_fields
+                             if not field.primary_key and field.name not in STOCK_FIELDS])
+
+
+def stock_levels(shop, item_id):
+    return shop.item_inventory.objects.values(*STOCK_FIELDS).get(id=item_id)
+
+
+def receive(shop, item_id, quantity):
+    apply_deltas(shop, quantity_in={item_id: quantity or 0})
+
+
+def issue(shop, item_id, quantity):
+    # Takes quantity out and returns the levels it left behind, read under the same row lock
+    with transaction.atomic():
+        apply_deltas(shop, quantity_out={item_id: quantity or 0})
+        return stock_levels(shop, item_id)
+
+
+def set_quantities(shop, item_id, quantity_in, quantity_out):
+    # Manual correction from the edit form: the clerk's figures replace the stored ones
+    with transaction.atomic():
+        rows = shop.item_inventory.objects.filter(id=item_id)
+        rows.update(quantity_in=quantity_in or 0, quantity_out=quantity_out or 0)
+        recompute_stock(rows)
+
+
+def merge_into(shop, source_id, target_id, quantity_in, quantity_out):
+    # Folds an edited item into an existing duplicate: its quantities are added to the target and the
+    # source row is deleted. Both rows are locked first so a concurrent movement on either isn't lost.
+    with transaction.atomic():
+        list(shop.item_inventory.objects.select_for_update().filter(id__in=[source_id, target_id]).order_by('id'))
+        apply_deltas(shop, quantity_in={target_id: quantity_in or 0}, quantity_out={target_id: quantity_out or 0})
+        shop.item_inventory.objects.filter(id=source_id).delete()
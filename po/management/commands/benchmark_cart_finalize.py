@@ -0,0 +1,48 @@
+from datetime import date
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from po.delivery import finalize_cart
+from po.shops import SHOPS, get_shop
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Times finalizing a cart of synthetic items; everything it writes is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200, help='Cart rows in the delivery')
+        parser.add_argument('--shop', choices=[shop.name for shop in SHOPS], default='po')
+        parser.add_argument('--location-type', choices=['site', 'client'], default='site')
+
+    def handle(self, *args, **options):
+        shop = get_shop(options['shop'])
+        try:
+            with transaction.atomic():
+                items = shop.item_inventory.objects.bulk_create([
+                    shop.item_inventory(item_code=f'BENCH-{i:05d}', supplier='Benchmark', unit='pcs',
+                                        po_product_name=f'Benchmark item {i}', quantity_in=1000, quantity_out=0,
+                                        stock=1000, price=Decimal('12.50'))
+                    for i in range(options['items'])
+                ])
+                if not all(item.pk for item in items):  # Backends that don't return ids from bulk_create
+                    items = shop.item_inventory.objects.filter(supplier='Benchmark', item_code__startswith='BENCH-')
+                cart = shop.cart.objects.bulk_create([shop.cart(item=item, quantity=Decimal('3')) for item in items])
+
+                with CaptureQueriesContext(connection) as queries:
+                    delivered, timer = finalize_cart(shop, shop.cart.objects.filter(id__in=[row.id for row in cart]),
+                                                     date.today(), options['location_type'], 'Benchmark Site',
+                                                     'DR', 'BENCH-1', 'SI', 'BENCH-1')
+                self.stdout.write(f'{shop}: {delivered} cart row(s) in {timer.total:.1f}ms, '
+                                  f'{len(queries.captured_queries)} queries')
+                for phase, elapsed in timer.timings.items():
+                    self.stdout.write(f'{phase:>8}: {elapsed:8.1f}ms')
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,58 @@
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from po.exports import PURCHASE_ORDER_SHEET
+from po.jobs import FOLDER_WORKERS, build_workbooks, write_zip
+
+
+def synthetic_rows(folder_index, count):
+    # Plain tuples shaped like PURCHASE_ORDER_SHEET rows; nothing is written to the database
+    rng = random.Random(folder_index)
+    start = date(2024, 1, 1)
+    for i in range(count):
+        quantity = rng.randint(1, 500)
+        price = Decimal(rng.randint(100, 100000)) / 100
+        yield (
+            start + timedelta(days=rng.randint(0, 365)), f'PO-{folder_index:04d}-{i:05d}', 'Purchaser',
+            'Brand', f'IC{rng.randint(1, 9999):04d}', f'Item {rng.randint(1, 2000)}', quantity, 'pcs', price,
+            price * quantity, f'Site {rng.randint(1, 50)}', f'FBBD-{i}', '', f'Supplier {folder_index}',
+            f'DR-{i}', str(i), 'Sales Invoice', f'INV-{i}', f'PR-{i}', 'Paid', '',
+        )
+
+
+class Command(BaseCommand):
+    help = 'Compares serial, threaded and process-pool folder workbook generation on synthetic data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--folders', type=int, default=500)
+        parser.add_argument('--rows', type=int, default=200, help='Rows per folder')
+        parser.add_argument('--workers', type=int, default=FOLDER_WORKERS)
+        parser.add_argument('--pools', default='serial,thread,process', help='Comma-separated pool kinds to run')
+
+    def handle(self, *args, **options):
+        spec = PURCHASE_ORDER_SHEET.with_title('Supplier Orders')
+        self.stdout.write(f"{options['folders']} folders x {options['rows']} rows, {options['workers']} workers")
+
+        timings = {}
+        for pool in options['pools'].split(','):
+            tasks = ((f'SupplierOrders_{index}.xlsx', spec, partial(synthetic_rows, index, options['rows']))
+                     for index in range(options['folders']))
+            with tempfile.TemporaryDirectory() as work_dir:
+                zip_path = os.path.join(work_dir, 'benchmark.zip')
+                started = time.perf_counter()
+                write_zip(zip_path, build_workbooks(tasks, work_dir, pool=pool, workers=options['workers']))
+                timings[pool] = time.perf_counter() - started
+                size = os.path.getsize(zip_path)
+            self.stdout.write(f'{pool:>8}: {timings[pool]:8.2f}s  ({size / 1024 / 1024:.1f} MB)')
+
+        if 'serial' in timings:
+            for pool, elapsed in timings.items():
+                if pool != 'serial':
+                    self.stdout.write(f"{pool} speedup: {timings['serial'] / elapsed:.2f}x")
@@ -0,0 +1,85 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from po.models import PurchaseOrder
+from po.shops import PO_SHOP, SHOPS, get_shop
+
+PAGE_SIZE = 100
+SAMPLE = 'sample'  # Placeholder value for equality lookups; the plan does not depend on it
+
+# Plan fragments that mean the backend reads the whole table (or sorts it) instead of using an index
+FULL_SCAN_PATTERNS = {
+    'sqlite': [re.compile(r'\bSCAN (?!.*\bUSING (COVERING )?INDEX\b)'), re.compile(r'USE TEMP B-TREE FOR ORDER BY')],
+    'mysql': [re.compile(r'"access_type": "ALL"'), re.compile(r'"using_filesort": true')],
+    'postgresql': [re.compile(r'Seq Scan'), re.compile(r'^\s*(->\s*)?Sort\b', re.M)],
+}
+
+
+def shop_queries(shop):
+    # The main query behind each view, as the view runs it (sliced to the first page where it paginates)
+    return [
+        ('transaction_history', shop.inventory_history.objects.exclude(date__isnull=True).order_by('-date')[:PAGE_SIZE]),
+        ('stock_in_transaction_history',
+         shop.stock_in_history.objects.exclude(date__isnull=True).order_by('-date')[:PAGE_SIZE]),
+        ('stock_in_supplier_folder', shop.stock_in_history.objects.filter(supplier=SAMPLE, supplier_folder__isnull=True)),
+        ('inventory_table', shop.item_inventory.objects.order_by('po_product_name')[:PAGE_SIZE]),
+        ('stock_in_item_match', shop.item_inventory.objects.filter(item_code=SAMPLE, supplier=SAMPLE)),
+        ('item_details', shop.item_inventory.objects.filter(po_product_name=SAMPLE)),
+        ('item_code_sync', shop.item_code_list.objects.filter(po_product_name__in=[SAMPLE])),
+    ]
+
+
+def purchase_order_queries():
+    return [
+        ('purchase_order_list', PurchaseOrder.objects.filter(folder__isnull=True, archived=False)[:PAGE_SIZE]),
+        ('archive_folder_contents', PurchaseOrder.objects.filter(folder=1)),
+        ('supplier_folder_sync', PurchaseOrder.objects.filter(supplier=SAMPLE, supplier_folder__isnull=True)),
+        ('supplier_contents', PurchaseOrder.objects.filter(supplier=SAMPLE)),
+    ]
+
+
+def explain(queryset):
+    vendor = connections[queryset.db].vendor
+    # MySQL's tabular output is hard to read back; its JSON plan spells out access types
+    return queryset.explain(format='json') if vendor == 'mysql' else queryset.explain()
+
+
+def full_scan(vendor, plan):
+    return any(pattern.search(plan) for pattern in FULL_SCAN_PATTERNS.get(vendor, []))
+
+
+class Command(BaseCommand):
+    help = 'Prints the EXPLAIN plan of each view\'s main query so missing or unused indexes show up.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', choices=[shop.name for shop in SHOPS] + ['all'], default='all')
+        parser.add_argument('--query', action='append', help='Only explain the named query (repeatable)')
+        parser.add_argument('--check', action='store_true',
+                            help='Fail when a plan reads a whole table or sorts it instead of using an index')
+
+    def handle(self, *args, **options):
+        shops = SHOPS if options['shop'] == 'all' else [get_shop(options['shop'])]
+        queries = []
+        for shop in shops:
+            if shop is PO_SHOP:
+                queries += [(f'{shop}.{name}', qs) for name, qs in purchase_order_queries()]
+            queries += [(f'{shop}.{name}', qs) for name, qs in shop_queries(shop)]
+        if options['query']:
+            queries = [(label, qs) for label, qs in queries if label.split('.', 1)[1] in options['query']]
+
+        scans = []
+        for label, queryset in queries:
+            vendor = connections[queryset.db].vendor
+            plan = explain(queryset)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label} ({vendor})'))
+            self.stdout.write(plan)
+            if full_scan(vendor, plan):
+                scans.append(label)
+                self.stdout.write(self.style.WARNING('  full scan or sort'))
+            self.stdout.write('')
+
+        if options['check'] and scans:
+            raise CommandError(f'{len(scans)} queries not using an index: {", ".join(scans)}')
+        self.stdout.write(f'Explained {len(queries)} queries, {len(scans)} without an index')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from po.rollups import rebuild_rollups
+from po.shops import SHOPS
+
+
+class Command(BaseCommand):
+    help = 'Recounts the row count, total amount and last activity of every site and client folder.'
+
+    def handle(self, *args, **options):
+        for shop in SHOPS:
+            for folder_field, count in rebuild_rollups(shop.inventory_history).items():
+                self.stdout.write(f'{shop} {folder_field}: {count} folder(s) recounted')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from po.models import PurchaseOrder
+from po.search import refresh_search_text
+
+
+class Command(BaseCommand):
+    help = 'Recomputes PurchaseOrder.search_text, e.g. after rows were changed with queryset.update().'
+
+    def handle(self, *args, **options):
+        updated = refresh_search_text(PurchaseOrder.objects.all())
+        self.stdout.write(f'Rebuilt search text for {updated} purchase order(s)')
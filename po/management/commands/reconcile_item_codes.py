@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from po.catalog import reconcile_item_codes
+from po.shops import SHOPS, get_shop
+
+
+class Command(BaseCommand):
+    help = 'Adds any inventory item codes missing from the item code lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', choices=[shop.name for shop in SHOPS] + ['all'], default='all')
+
+    def handle(self, *args, **options):
+        shops = SHOPS if options['shop'] == 'all' else [get_shop(options['shop'])]
+        for shop in shops:
+            added = reconcile_item_codes(shop)
+            self.stdout.write(f'{shop}: added {added} item code(s)')
@@ -0,0 +1,40 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from po.jobs import run_pending_jobs
+from po.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Builds pending "Export All" archives. Use with EXPORT_JOB_RUNNER = "worker".'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the pending jobs and exit')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls')
+        parser.add_argument('--purge-days', type=int, default=None,
+                            help='Delete finished jobs (and their files) older than this many days')
+
+    def handle(self, *args, **options):
+        while True:
+            if options['purge_days'] is not None:
+                self.purge(options['purge_days'])
+
+            count = run_pending_jobs()
+            if count:
+                self.stdout.write(f'Processed {count} export job(s)')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def purge(self, days):
+        cutoff = timezone.now() - timedelta(days=days)
+        old_jobs = ExportJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+        for file_path in old_jobs.exclude(file_path='').values_list('file_path', flat=True):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        old_jobs.delete()
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from po.folders import BATCH_SIZE, sync_folders
+from po.shops import SHOPS, get_shop
+
+
+class Command(BaseCommand):
+    help = ('Files every purchase order, stock in and delivery into the folder named after its supplier, '
+            'site or client.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shop', choices=[shop.name for shop in SHOPS] + ['all'], default='all')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Create a folder for every name that does not have one yet')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        shops = SHOPS if options['shop'] == 'all' else [get_shop(options['shop'])]
+        for shop in shops:
+            moved = sync_folders(shop, create_missing=options['create_missing'], batch_size=options['batch_size'])
+            for label, count in moved.items():
+                self.stdout.write(f'{shop} {label}: {count} row(s) moved')
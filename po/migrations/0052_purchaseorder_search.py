@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:45
+
+import po.search
+from django.db import migrations, models
+
+
+def fill_search_text(apps, schema_editor):
+    PurchaseOrder = apps.get_model('po', 'PurchaseOrder')
+    batch = []
+    for order in PurchaseOrder.objects.using(schema_editor.connection.alias).iterator(chunk_size=1000):
+        order.search_text = po.search.build_search_text(order)
+        batch.append(order)
+        if len(batch) >= 1000:
+            PurchaseOrder.objects.using(schema_editor.connection.alias).bulk_update(batch, ['search_text'])
+            batch = []
+    if batch:
+        PurchaseOrder.objects.using(schema_editor.connection.alias).bulk_update(batch, ['search_text'])
+
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE po_purchaseorder ADD FULLTEXT INDEX po_purchaseorder_search_ft (search_text)')
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE po_purchaseorder DROP INDEX po_purchaseorder_search_ft')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('po', '0051_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='search_text',
+            field=po.search.SearchField(blank=True, default='', editable=False),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='invoice_no',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='Invoice No.'),
+        ),
+        migrations.AlterField(
+            model_name='purchaseorder',
+            name='po_number',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True, verbose_name='PO#'),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.7 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('po', '0052_purchaseorder_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryhistory',
+            index=models.Index(fields=['-date', '-id'], name='po_history_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemcodelist',
+            index=models.Index(fields=['po_product_name', 'item_code'], name='po_itemcode_name_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iteminventory',
+            index=models.Index(fields=['item_code', 'supplier'], name='po_item_code_supplier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='iteminventory',
+            index=models.Index(fields=['po_product_name'], name='po_item_product_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['folder', 'archived'], name='po_order_folder_archived_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier', 'supplier_folder'], name='po_order_supplier_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockinhistory',
+            index=models.Index(fields=['-date', '-id'], name='po_stockin_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockinhistory',
+            index=models.Index(fields=['supplier', 'supplier_folder'], name='po_stockin_supplier_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.7 on 2026-10-18 08:21
+
+from django.conf import settings
+import po.carts
+from django.db import migrations, models
+
+
+def merge_duplicates(apps, schema_editor):
+    po.carts.merge_duplicate_lines(apps.get_model('po', 'Cart'), using=schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('po', '0055_folder_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('cart_key', 'item'), name='po_cart_key_item_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='cart',
+            name='po_cart_key_item_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('po', '0057_exportjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itemcodelist',
+            name='item_code',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AlterField(
+            model_name='itemcodelist',
+            name='unit',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+    ]
@@ -1,24 +1,40 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+from .search import SearchField, build_search_text
+
 
 class ItemCodeList(models.Model):
     item_code = models.CharField(max_length=100, null=True, blank=True)  # Allow null and blank
     po_product_name = models.CharField(max_length=100)
     unit = models.CharField(max_length=50, null=True, blank=True)  # Allow null and blank
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['po_product_name', 'item_code'], name='po_itemcode_name_code_idx'),  # Catalog sync looks names up
+        ]
+
     def __str__(self):
         return f"{self.item_code} - {self.po_product_name} - {self.unit}"
 
 
 class SiteInventoryFolder(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    # Rollups of the folder's InventoryHistory rows, kept current by po/rollups.py
+    row_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    last_activity = models.DateField(null=True, blank=True)
 
     def __str__(self):
         return self.name
 
 class ClientInventoryFolder(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    # Rollups of the folder's InventoryHistory rows, kept current by po/rollups.py
+    row_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    last_activity = models.DateField(null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -82,6 +98,12 @@ class StockInHistory(models.Model):
     remarks2 = models.CharField(max_length=20, choices=REMARKS2_CHOICES, verbose_name='Remarks2',null=True, blank=True)
     supplier_folder = models.ForeignKey(InventorySupplierFolder, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='po_stockin_date_idx'),  # Stock-in history, newest first
+            models.Index(fields=['supplier', 'supplier_folder'], name='po_stockin_supplier_idx'),  # Filing stock-ins into supplier folders
+        ]
+
     @property
     def remarks2_badge(self):
         # Define a dictionary that maps remarks2 choices to corresponding background colors
@@ -137,6 +159,12 @@ class ItemInventory(models.Model):
     invoice_type = models.CharField(max_length=10, choices=INVOICE_CHOICES, verbose_name='Invoice#', null=True, blank=True)
     invoice_no = models.CharField(max_length=255, verbose_name='Invoice No.', null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['item_code', 'supplier'], name='po_item_code_supplier_idx'),  # Stock-in matching
+            models.Index(fields=['po_product_name'], name='po_item_product_name_idx'),  # Name lookups and the inventory table ordering
+        ]
+
 
 class InventoryHistory(models.Model):
     SITE_OR_CLIENT_CHOICES = (
@@ -179,11 +207,24 @@ class InventoryHistory(models.Model):
     site_or_client_choice = models.CharField(max_length=10, choices=SITE_OR_CLIENT_CHOICES, blank=True, null=True)
     remarks = models.TextField(blank=True, null=True, verbose_name='Remarks')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-date', '-id'], name='po_history_date_idx'),  # Transaction history, newest first
+        ]
+
 
 
 class Cart(models.Model):
     item = models.ForeignKey(ItemInventory, on_delete=models.CASCADE)
     quantity = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    cart_key = models.CharField(max_length=32, blank=True, default='')  # The session's cart, see po/carts.py
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # One line per item in a cart; concurrent adds merge into it (po/carts.py)
+            models.UniqueConstraint(fields=['cart_key', 'item'], name='po_cart_key_item_uniq'),
+        ]
 
     def __str__(self):
         return f"{self.item} - {self.quantity}"
@@ -224,7 +265,7 @@ class PurchaseOrder(models.Model):
 
     id = models.AutoField(primary_key=True)
     date = models.DateField(verbose_name='Date', null=True, blank=True)
-    po_number = models.CharField(max_length=255, verbose_name='PO#', null=True, blank=True)
+    po_number = models.CharField(max_length=255, verbose_name='PO#', null=True, blank=True, db_index=True)
     purchaser = models.CharField(max_length=255, verbose_name='Purchaser', null=True, blank=True)
     brand = models.CharField(max_length=255, verbose_name='Brand', null=True, blank=True)
     item_code = models.CharField(max_length=255, blank=True, null=True, verbose_name='Item Code')
@@ -240,13 +281,26 @@ class PurchaseOrder(models.Model):
     delivery_ref = models.CharField(max_length=2, choices=DELIVERY_REF_CHOICES, verbose_name='Delivery Ref#',null=True, blank=True)
     delivery_no = models.CharField(max_length=255, verbose_name='Delivery No.',null=True, blank=True)
     invoice_type = models.CharField(max_length=10, choices=INVOICE_CHOICES, verbose_name='Invoice#',null=True, blank=True)
-    invoice_no = models.CharField(max_length=255, verbose_name='Invoice No.',null=True, blank=True)
+    invoice_no = models.CharField(max_length=255, verbose_name='Invoice No.',null=True, blank=True, db_index=True)
     payment_req_ref = models.CharField(max_length=255, verbose_name='Payment Req Ref#',null=True, blank=True)
     payment_details = models.TextField(max_length=20, choices=PAYMENT_DETAILS_CHOICES, blank=True, null=True, verbose_name='Payment Details')
     remarks2 = models.CharField(max_length=20, choices=REMARKS2_CHOICES, verbose_name='Remarks2',null=True, blank=True)
     folder = models.ForeignKey(ArchiveFolder, on_delete=models.SET_NULL, null=True, blank=True)
     archived = models.BooleanField(default=False)
     supplier_folder = models.ForeignKey(SupplierFolder, on_delete=models.SET_NULL, null=True, blank=True)
+    search_text = SearchField()  # Normalized copy of the searchable columns, rebuilt on every save
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['folder', 'archived'], name='po_order_folder_archived_idx'),  # Unfiled orders on the dashboard
+            models.Index(fields=['supplier', 'supplier_folder'], name='po_order_supplier_idx'),  # Filing orders into supplier folders
+        ]
+
+    def save(self, *args, **kwargs):
+        self.search_text = build_search_text(self)
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'search_text'}
+        super().save(*args, **kwargs)
 
     @property
     def remarks2_badge(self):
@@ -273,8 +327,34 @@ class poCart(models.Model):
     particulars = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE)  # Links to PurchaseOrder model
     fbbd_ref_number = models.CharField(max_length=100, blank=True, null=True)  # Optional reference field
     remarks2 = models.CharField(max_length=20, choices=REMARKS2_CHOICES, verbose_name='Remarks2',null=True, blank=True)
+    cart_key = models.CharField(max_length=32, blank=True, default='')  # The session's cart, see po/carts.py
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['cart_key', 'particulars'], name='po_pocart_key_order_idx'),
+        ]
 
 
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ]
 
+    kind = models.CharField(max_length=50)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    file_name = models.CharField(max_length=255, blank=True)  # Name the archive is downloaded as
+    file_path = models.CharField(max_length=500, blank=True)  # Where the finished archive lives on disk
+    total_folders = models.IntegerField(default=0)
+    processed_folders = models.IntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)  # Times a runner has claimed it
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Last progress from the runner building it
 
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
@@ -0,0 +1,51 @@
+import logging
+
+from django.db import transaction
+
+from .models import PurchaseOrder
+from .search import refresh_search_text
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+# The columns the front desk sets on many orders at once
+STATUS_FIELDS = ('fbbd_ref_number', 'remarks2')
+REMARKS2_VALUES = {'', *(value for value, _ in PurchaseOrder.REMARKS2_CHOICES)}
+
+
+def update_status(order_ids, **values):
+    # Sets the status columns on every order in order_ids with one UPDATE ... WHERE id IN (...) per batch.
+    # Rows that already hold the new values are left alone, so the UPDATE only touches, and the result only
+    # lists, the orders that actually changed.
+    # Returns (ids of changed orders, ids that don't exist).
+    unknown = set(values) - set(STATUS_FIELDS)
+    if unknown:
+        raise ValueError(f"Not a status field: {', '.join(sorted(unknown))}")
+    if values.get('remarks2', '') not in REMARKS2_VALUES:
+        raise ValueError(f"Invalid remarks2: {values['remarks2']}")
+
+    ids = sorted(set(order_ids))
+    fields = list(values)
+    wanted = tuple(values[field] for field in fields)
+    changed, found = [], set()
+    for start in range(0, len(ids), BATCH_SIZE):
+        batch = ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            # Lock the batch and read its current values in the same query
+            current = PurchaseOrder.objects.select_for_update().filter(id__in=batch).values_list('id', *fields)
+            batch_changed = []
+            for order_id, *stored in current:
+                found.add(order_id)
+                if tuple(stored) != wanted:
+                    batch_changed.append(order_id)
+            if batch_changed:
+                orders = PurchaseOrder.objects.filter(id__in=batch_changed)
+                orders.update(**values)
+                refresh_search_text(orders)
+        changed.extend(batch_changed)
+
+    missing = [order_id for order_id in ids if order_id not in found]
+    logger.info('Status update %s: %d order(s) changed, %d unchanged, %d missing', values, len(changed),
+                len(found) - len(changed), len(missing))
+    return changed, missing
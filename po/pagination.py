@@ -0,0 +1,206 @@
+import base64
+import hashlib
+import json
+from functools import cached_property
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+
+PAGE_SIZE = 100
+COUNT_CACHE_SECONDS = getattr(settings, 'PAGINATION_COUNT_CACHE_SECONDS', 60)
+
+HISTORY_KEYS = ('-date', '-id')  # Newest first; the views exclude rows without a date
+ID_KEYS = ('id',)  # Insertion order, which is what the unordered lists showed before
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_number(value, default=1):
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return default
+
+
+class KeysetPaginator:
+    # Pages through a queryset by seeking past the last row seen (WHERE (date, id) < (...)) instead of
+    # OFFSET, so page 500 costs the same as page 1. Numbered jumps still use OFFSET; prev/next carry a cursor.
+    # count is 'exact', 'cached' (COUNT(*) kept in the cache for a minute) or 'estimate' (table statistics
+    # when the queryset is unfiltered, otherwise cached).
+    def __init__(self, queryset, per_page=PAGE_SIZE, keys=ID_KEYS, count='exact'):
+        self.keys = keys
+        self.queryset = queryset.order_by(*keys)
+        self.per_page = per_page
+        self.count_mode = count
+        self.fields = [queryset.model._meta.get_field(key.lstrip('-')) for key in keys]
+
+    @cached_property
+    def count(self):
+        if self.count_mode == 'estimate':
+            estimate = estimate_count(self.queryset)
+            if estimate is not None:
+                return estimate
+        if self.count_mode in ('cached', 'estimate'):
+            return cached_count(self.queryset)
+        return self.queryset.count()
+
+    @property
+    def num_pages(self):
+        return max(-(-self.count // self.per_page), 1)
+
+    @property
+    def page_range(self):
+        return range(1, self.num_pages + 1)
+
+    def _seek(self, values, forward):
+        # Rows strictly after the cursor in the page order (or strictly before it when going back)
+        condition = Q()
+        for position, (key, field) in enumerate(zip(self.keys, self.fields)):
+            descending = key.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{field.name}__{lookup}': values[position]})
+            for previous, value in zip(self.fields[:position], values):
+                step &= Q(**{previous.name: value})
+            condition |= step
+        return condition
+
+    def _reversed(self):
+        return [key[1:] if key.startswith('-') else f'-{key}' for key in self.keys]
+
+    def _cursor_values(self, cursor):
+        values = decode_cursor(cursor) if cursor else None
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            return None
+        try:
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            return None
+
+    def page(self, number=1, after=None, before=None):
+        number = _parse_number(number)
+        values = self._cursor_values(after or before)
+        if values is not None and after:
+            rows = list(self.queryset.filter(self._seek(values, forward=True))[:self.per_page + 1])
+            if rows:
+                return KeysetPage(self, rows[:self.per_page], number, True, len(rows) > self.per_page)
+        elif values is not None:
+            rows = list(self.queryset.filter(self._seek(values, forward=False)).order_by(*self._reversed())
+                        [:self.per_page + 1])
+            if rows:
+                has_previous = len(rows) > self.per_page
+                rows = rows[:self.per_page][::-1]
+                return KeysetPage(self, rows, number if has_previous else 1, has_previous, True)
+
+        # No usable cursor: plain OFFSET page, clamped to the last page like Paginator.get_page
+        number = min(number, self.num_pages)
+        offset = (number - 1) * self.per_page
+        rows = list(self.queryset[offset:offset + self.per_page + 1])
+        return KeysetPage(self, rows[:self.per_page], number, number > 1, len(rows) > self.per_page)
+
+    def feed(self, after=None):
+        # Forward-only: the rows following the cursor (from the start without one), never counted and
+        # never wrapped back to the first page, for lists that load more as they scroll
+        values = self._cursor_values(after)
+        rows = self.queryset if values is None else self.queryset.filter(self._seek(values, forward=True))
+        rows = list(rows[:self.per_page + 1])
+        return KeysetPage(self, rows[:self.per_page], 1, values is not None, len(rows) > self.per_page)
+
+
+class KeysetPage:
+    # Quacks like django.core.paginator.Page for the templates, plus next_cursor/previous_cursor
+    def __init__(self, paginator, object_list, number, has_previous, has_next):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.number = number
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def previous_page_number(self):
+        return max(self.number - 1, 1)
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def start_index(self):
+        return (self.number - 1) * self.paginator.per_page + 1 if self.object_list else 0
+
+    def end_index(self):
+        return (self.number - 1) * self.paginator.per_page + len(self.object_list)
+
+    def _cursor(self, row):
+        values = [getattr(row, field.attname) for field in self.paginator.fields]
+        return encode_cursor(values) if None not in values else ''
+
+    @property
+    def next_cursor(self):
+        return self._cursor(self.object_list[-1]) if self._has_next and self.object_list else ''
+
+    @property
+    def previous_cursor(self):
+        return self._cursor(self.object_list[0]) if self._has_previous and self.object_list else ''
+
+
+def cached_count(queryset):
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.md5(repr((queryset.db, sql, tuple(map(str, params)))).encode()).hexdigest()
+    key = f'pagination-count:{digest}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_SECONDS)
+    return count
+
+
+def estimate_count(queryset):
+    # Row estimate from the table statistics; only meaningful for a whole, unfiltered table
+    if queryset.query.where:
+        return None
+    table = queryset.model._meta.db_table
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('SELECT TABLE_ROWS FROM information_schema.TABLES '
+                           'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [table])
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row and row[0] is not None else None
+
+
+def paginate(request, queryset, keys=ID_KEYS, per_page=PAGE_SIZE, count='exact'):
+    # ?page=N jumps with OFFSET; ?after=/&before= cursors from the prev/next links seek instead
+    paginator = KeysetPaginator(queryset, per_page=per_page, keys=keys, count=count)
+    return paginator.page(request.GET.get('page'), after=request.GET.get('after'),
+                          before=request.GET.get('before'))
@@ -0,0 +1,51 @@
+from django.http import JsonResponse
+
+from .models import PurchaseOrder
+from .pagination import KeysetPaginator, ID_KEYS
+from .search import search_purchase_orders
+
+PICKER_PAGE_SIZE = 60
+PICKER_MAX_LIMIT = 200
+
+# The bulk pages list their candidates a page at a time: the first page is rendered with the page and
+# the rest are fetched from a JSON feed (?q=, ?limit=, ?after=) as the list is scrolled or searched.
+
+
+def picker_limit(request):
+    try:
+        return min(max(int(request.GET.get('limit', PICKER_PAGE_SIZE)), 1), PICKER_MAX_LIMIT)
+    except ValueError:
+        return PICKER_PAGE_SIZE
+
+
+def picker_page(request, queryset, keys=ID_KEYS):
+    paginator = KeysetPaginator(queryset, per_page=picker_limit(request), keys=keys)
+    return paginator.feed(after=request.GET.get('after'))
+
+
+def picker_response(page, row):
+    return JsonResponse({'items': [row(obj) for obj in page], 'next': page.next_cursor})
+
+
+def inventory_picker(shop, query):
+    items = shop.item_inventory.objects.only('id', 'po_product_name', 'supplier', 'stock')
+    if query:
+        items = items.filter(po_product_name__icontains=query)
+    return items
+
+
+def inventory_row(item):
+    return {'id': item.id, 'po_product_name': item.po_product_name, 'supplier': item.supplier, 'stock': item.stock}
+
+
+def order_picker(query, include_filed=False):
+    # Archived and foldered orders are done with, so they're left out unless asked for (?all=1)
+    orders = PurchaseOrder.objects.only('id', 'po_number', 'particulars', 'quantity', 'price', 'remarks2')
+    if not include_filed:
+        orders = orders.filter(folder__isnull=True, archived=False)
+    return search_purchase_orders(orders, query)
+
+
+def order_row(order):
+    return {'id': order.id, 'po_number': order.po_number, 'particulars': order.particulars,
+            'quantity': order.quantity, 'price': order.price, 'remarks2': order.remarks2}
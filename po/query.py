@@ -0,0 +1,152 @@
+import calendar
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+
+from django.db import models
+from django.db.models import Q
+
+DATE_FORMATS = ['%b %d, %Y', '%B %d, %Y', '%b %d %Y', '%B %d %Y', '%d %b %Y', '%d %B %Y', '%Y-%m-%d', '%m/%d/%Y']
+MONTH_YEAR_FORMATS = ['%b %Y', '%B %Y', '%b, %Y', '%B, %Y', '%Y-%m', '%m/%Y']
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_abbr) if name})
+MONTHS['sept'] = 9
+
+NUMBER = re.compile(r'^-?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?$')
+# A single word with at least one digit, e.g. "PO-1023", "SI#5567" or "88123"
+REFERENCE = re.compile(r'^(?=.*\d)[\w#./-]+$')
+
+
+class ParsedQuery:
+    # kind is one of 'date', 'month', 'number', 'reference' or 'text'
+    def __init__(self, kind, text, value=None, month=None, year=None):
+        self.kind = kind
+        self.text = text
+        self.value = value
+        self.month = month
+        self.year = year
+
+    def __repr__(self):
+        return f'<ParsedQuery {self.kind} {self.text!r}>'
+
+
+def _strptime(text, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def parse_query(text):
+    text = ' '.join((text or '').split())
+    if not text:
+        return None
+
+    parsed = _strptime(text, DATE_FORMATS)
+    if parsed:
+        return ParsedQuery('date', text, value=parsed.date())
+
+    parsed = _strptime(text, MONTH_YEAR_FORMATS)
+    if parsed:
+        return ParsedQuery('month', text, month=parsed.month, year=parsed.year)
+
+    if text.lower() in MONTHS:
+        return ParsedQuery('month', text, month=MONTHS[text.lower()])
+
+    if NUMBER.match(text) and any(char.isdigit() for char in text):
+        try:
+            return ParsedQuery('number', text, value=Decimal(text.replace(',', '')))
+        except InvalidOperation:
+            pass
+
+    if REFERENCE.match(text):
+        return ParsedQuery('reference', text)
+
+    return ParsedQuery('text', text)
+
+
+def month_filter(field, month, year=None):
+    # With a year the month becomes a date range, which can use an index on the date column
+    if year is None:
+        return Q(**{f'{field}__month': month})
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return Q(**{f'{field}__gte': start, f'{field}__lt': end})
+
+
+def icontains_search(fields):
+    def search(text, db_alias):
+        return reduce(or_, (Q(**{f'{field}__icontains': text}) for field in fields))
+    return search
+
+
+class SearchSpec:
+    def __init__(self, text_search, number_fields=(), reference_fields=(), date_field='date', month_numbers=False):
+        self.text_search = text_search  # Callable (text, db alias) -> Q for free-text input
+        self.number_fields = number_fields  # Matched exactly when the input is a number
+        self.reference_fields = reference_fields  # Matched exactly when the input looks like a PO#/invoice#
+        self.date_field = date_field
+        self.month_numbers = month_numbers  # Treat 1-12 as a month, as the PO dashboards always have
+
+    def number_filter(self, model, value):
+        lookups = []
+        for field_name in self.number_fields:
+            field = model._meta.get_field(field_name)
+            if isinstance(field, models.DecimalField):
+                if value.as_tuple().exponent >= -field.decimal_places \
+                        and abs(value) < 10 ** (field.max_digits - field.decimal_places):
+                    lookups.append(Q(**{field_name: value}))
+            elif value == value.to_integral_value():
+                lookups.append(Q(**{field_name: int(value)}))
+        return reduce(or_, lookups) if lookups else None
+
+
+def apply_search(queryset, query, spec):
+    # Narrowest filter first: exact dates and date ranges, then exact reference and number matches
+    # (used only when they find something), and only then the free-text search
+    parsed = parse_query(query)
+    if parsed is None:
+        return queryset
+
+    if parsed.kind == 'date':
+        return queryset.filter(**{spec.date_field: parsed.value})
+
+    if parsed.kind == 'month':
+        return queryset.filter(month_filter(spec.date_field, parsed.month, parsed.year))
+
+    if parsed.kind == 'number' and spec.month_numbers and parsed.value in range(1, 13):
+        return queryset.filter(month_filter(spec.date_field, int(parsed.value)))
+
+    if parsed.kind in ('number', 'reference') and spec.reference_fields:
+        exact = queryset.filter(reduce(or_, (Q(**{field: parsed.text}) for field in spec.reference_fields)))
+        if exact.exists():
+            return exact
+
+    if parsed.kind == 'number':
+        number_filter = spec.number_filter(queryset.model, parsed.value)
+        if number_filter is not None:
+            numbers = queryset.filter(number_filter)
+            if numbers.exists():
+                return numbers
+
+    return queryset.filter(spec.text_search(parsed.text, queryset.db))
+
+
+def apply_date_filter(queryset, query, date_field='date'):
+    # The exports' separate ?date= box: a day, a month with or without its year, or a month number.
+    # Anything else leaves the queryset alone, as the old strptime fallbacks did.
+    parsed = parse_query(query)
+    if parsed is None:
+        return queryset
+    if parsed.kind == 'date':
+        return queryset.filter(**{date_field: parsed.value})
+    if parsed.kind == 'month':
+        return queryset.filter(month_filter(date_field, parsed.month, parsed.year))
+    if parsed.kind == 'number' and parsed.value in range(1, 13):
+        return queryset.filter(month_filter(date_field, int(parsed.value)))
+    return queryset
@@ -0,0 +1,60 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+ROLE_CACHE_SECONDS = getattr(settings, 'ROLE_CACHE_SECONDS', 300)
+SESSION_KEY = 'role'
+
+# Dashboard roles are group names, checked in this order; a superuser without one of them is SUPERUSER
+ACCOUNTANT = 'Accountant'
+FRONT_DESK = 'Front Desk'
+INVENTORY_MANAGER = 'Inventory Manager'
+JUBAN_INVENTORY_MANAGER = 'Juban Inventory Manager'
+ROLES = (ACCOUNTANT, FRONT_DESK, INVENTORY_MANAGER, JUBAN_INVENTORY_MANAGER)
+SUPERUSER = 'superuser'
+
+
+def _version_keys(user_id):
+    return ['roles-version', f'roles-version:{user_id}']
+
+
+def roles_changed(user_ids=None):
+    # Called from the group signals; sessions holding a role resolved before this re-resolve it.
+    # Without user_ids every user's role is invalidated (a group was renamed or deleted).
+    keys = [f'roles-version:{user_id}' for user_id in user_ids] if user_ids else ['roles-version']
+    cache.set_many({key: time.time_ns() for key in keys}, None)
+
+
+def resolve_role(user):
+    # One query for all of the user's group names
+    names = set(user.groups.values_list('name', flat=True))
+    for role in ROLES:
+        if role in names:
+            return role
+    return SUPERUSER if user.is_superuser else None
+
+
+def user_role(request):
+    # The resolved role is kept in the session along with the versions it was resolved under, so a
+    # dashboard hit costs a cache read instead of group queries. Entries also expire after
+    # ROLE_CACHE_SECONDS, which bounds how stale a role can get when the cache isn't shared between
+    # processes (the default LocMemCache).
+    if hasattr(request, '_role'):
+        return request._role
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None
+
+    keys = _version_keys(user.pk)
+    stored = cache.get_many(keys)
+    versions = [stored.get(key, 0) for key in keys]
+    cached = request.session.get(SESSION_KEY)
+    if cached and cached['user'] == user.pk and cached['versions'] == versions and cached['expires'] > time.time():
+        role = cached['role']
+    else:
+        role = resolve_role(user)
+        request.session[SESSION_KEY] = {'user': user.pk, 'role': role, 'versions': versions,
+                                        'expires': time.time() + ROLE_CACHE_SECONDS}
+    request._role = role
+    return role
@@ -0,0 +1,119 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+# Site and client folders carry row_count, total_amount and last_activity for their InventoryHistory rows,
+# so folder pages and lists show totals without aggregating the history. Single-row saves and deletes are
+# tracked by the signals in each app; bulk writes (finalize_cart, assign_folder) call in here themselves.
+FOLDER_FIELDS = ('site_inventory_folder', 'client_inventory_folder')
+
+
+class RollupChange:
+    def __init__(self):
+        self.rows = 0
+        self.amount = Decimal(0)
+        self.latest = None
+        self.removed = False
+
+
+def rollup_changes(added=(), removed=()):
+    # {(folder field, folder id): RollupChange} for history rows added to and removed from their folders
+    changes = defaultdict(RollupChange)
+    for rows, sign in ((added, 1), (removed, -1)):
+        for row in rows:
+            for folder_field in FOLDER_FIELDS:
+                folder_id = getattr(row, f'{folder_field}_id')
+                if folder_id is None:
+                    continue
+                change = changes[folder_field, folder_id]
+                change.rows += sign
+                change.amount += sign * (row.total_amount or 0)
+                if sign < 0:
+                    change.removed = True
+                elif row.date and (change.latest is None or row.date > change.latest):
+                    change.latest = row.date
+    return changes
+
+
+def apply_rollup_changes(history_model, changes, using='default'):
+    # One UPDATE per folder, relative to the stored figures so concurrent writers don't overwrite each other.
+    # last_activity can't go down incrementally, so folders that lost a row get it recomputed.
+    stale = defaultdict(set)
+    for (folder_field, folder_id), change in changes.items():
+        if change.removed:
+            stale[folder_field].add(folder_id)
+        if not (change.rows or change.amount or change.latest):
+            continue
+        values = {'row_count': F('row_count') + change.rows, 'total_amount': F('total_amount') + change.amount}
+        if change.latest:
+            latest = Value(change.latest)
+            values['last_activity'] = Greatest(Coalesce(F('last_activity'), latest), latest)
+        folder_model = history_model._meta.get_field(folder_field).related_model
+        folder_model.objects.using(using).filter(id=folder_id).update(**values)
+    for folder_field, folder_ids in stale.items():
+        recompute_last_activity(history_model, folder_field, folder_ids, using=using)
+
+
+def _history(history_model, folder_field, using):
+    # The folder's history rows, as a correlated subquery grouped by folder
+    return history_model.objects.using(using).filter(**{folder_field: OuterRef('pk')}).order_by().values(folder_field)
+
+
+def _folders(history_model, folder_field, folder_ids, using):
+    folders = history_model._meta.get_field(folder_field).related_model.objects.using(using).all()
+    return folders if folder_ids is None else folders.filter(id__in=list(folder_ids))
+
+
+def recompute_rollups(history_model, folder_field, folder_ids=None, using='default'):
+    # Recounts folders (all of them without folder_ids) from their history in one UPDATE ... SET col = (SELECT ...)
+    rows = _history(history_model, folder_field, using)
+    return _folders(history_model, folder_field, folder_ids, using).update(
+        row_count=Coalesce(Subquery(rows.annotate(n=Count('id')).values('n')), 0),
+        total_amount=Coalesce(Subquery(rows.annotate(amount=Sum('total_amount')).values('amount')), Value(Decimal(0))),
+        last_activity=Subquery(rows.annotate(latest=Max('date')).values('latest')),
+    )
+
+
+def recompute_last_activity(history_model, folder_field, folder_ids, using='default'):
+    rows = _history(history_model, folder_field, using)
+    return _folders(history_model, folder_field, folder_ids, using).update(
+        last_activity=Subquery(rows.annotate(latest=Max('date')).values('latest')))
+
+
+def folders_of(history_model, folder_field, ids, using='default'):
+    # The folders the given history rows are in now, e.g. before queryset.update() moves them elsewhere
+    return set(history_model.objects.using(using).filter(id__in=ids).exclude(**{f'{folder_field}__isnull': True})
+               .values_list(f'{folder_field}_id', flat=True).distinct())
+
+
+def rebuild_rollups(history_model, using='default'):
+    return {folder_field: recompute_rollups(history_model, folder_field, using=using) for folder_field in FOLDER_FIELDS}
+
+
+# Used by the InventoryHistory signals of both apps
+
+ROLLUP_SOURCE_FIELDS = {'date', 'total_amount', *FOLDER_FIELDS}
+
+
+def _tracked(update_fields):
+    return update_fields is None or not ROLLUP_SOURCE_FIELDS.isdisjoint(update_fields)
+
+
+def history_saving(history_model, instance, using, update_fields=None):
+    # pre_save: remember the row as stored, so post_save can take its old figures out of its old folders
+    if instance.pk is not None and _tracked(update_fields):
+        instance._rollup_stored = (history_model.objects.using(using).filter(pk=instance.pk)
+                                   .only('date', 'total_amount', *FOLDER_FIELDS).first())
+
+
+def history_saved(history_model, instance, using, update_fields=None):
+    if not _tracked(update_fields):
+        return
+    stored = instance.__dict__.pop('_rollup_stored', None)
+    apply_rollup_changes(history_model, rollup_changes(added=[instance], removed=[stored] if stored else []), using)
+
+
+def history_deleted(history_model, instance, using):
+    apply_rollup_changes(history_model, rollup_changes(removed=[instance]), using)
@@ -0,0 +1,137 @@
+import re
+
+from django.db import connections, models
+from django.db.models import Lookup, Q
+
+from .query import SearchSpec, apply_search, icontains_search
+
+# Fields folded into PurchaseOrder.search_text, in the order they are written
+PURCHASE_ORDER_SEARCH_FIELDS = [
+    'date', 'po_number', 'purchaser', 'brand', 'item_code', 'particulars', 'quantity', 'unit', 'price',
+    'total_amount', 'site_delivered', 'fbbd_ref_number', 'remarks', 'supplier', 'delivery_ref', 'delivery_no',
+    'invoice_type', 'invoice_no', 'payment_req_ref', 'payment_details', 'remarks2',
+]
+
+# InnoDB FULLTEXT ignores words shorter than innodb_ft_min_token_size (3 by default) and its
+# stopwords; a required (+) term it ignores would match nothing, so those tokens use LIKE instead
+FULLTEXT_MIN_TOKEN_SIZE = 3
+INNODB_STOPWORDS = {
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how', 'i', 'in',
+    'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what', 'when', 'where', 'who',
+    'will', 'with', 'und', 'www',
+}
+
+SEARCH_BATCH_SIZE = 1000
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    # Lower-cased words separated by single spaces; punctuation splits words ("PO-123" -> "po 123")
+    return _NON_WORD.sub(' ', str(text).lower()).strip()
+
+
+def tokenize(query):
+    return normalize(query).split()
+
+
+class SearchField(models.TextField):
+    # Denormalized, normalized copy of a row's searchable text. Stored with a leading and trailing
+    # space so a word prefix can be matched as " token" on backends without a full-text index.
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        kwargs.setdefault('editable', False)
+        super().__init__(*args, **kwargs)
+
+
+@SearchField.register_lookup
+class FullTextPrefix(Lookup):
+    # MATCH ... AGAINST in boolean mode; the right-hand side is a prepared '+word* +word*' string
+    lookup_name = 'fulltext'
+
+    def as_mysql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'MATCH ({lhs}) AGAINST ({rhs} IN BOOLEAN MODE)', lhs_params + rhs_params
+
+    def as_sql(self, compiler, connection):
+        raise NotImplementedError('The fulltext lookup is only available on MySQL.')
+
+
+def build_search_text(instance, fields=PURCHASE_ORDER_SEARCH_FIELDS):
+    values = []
+    for field in fields:
+        value = getattr(instance, field)
+        if value is None or value == '':
+            continue
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return f' {normalize(" ".join(map(str, values)))} '
+
+
+def uses_fulltext(db_alias):
+    return connections[db_alias].vendor == 'mysql'
+
+
+def token_prefix_q(text, db_alias, field='search_text'):
+    # Every word of the query has to start one of the row's words
+    condition = Q()
+    fulltext_terms = []
+    for token in tokenize(text):
+        if uses_fulltext(db_alias) and len(token) >= FULLTEXT_MIN_TOKEN_SIZE and token not in INNODB_STOPWORDS:
+            fulltext_terms.append(f'+{token}*')
+        else:
+            condition &= Q(**{f'{field}__contains': f' {token}'})
+    if fulltext_terms:
+        condition &= Q(**{f'{field}__fulltext': ' '.join(fulltext_terms)})
+    return condition
+
+
+PURCHASE_ORDER_SEARCH = SearchSpec(
+    token_prefix_q,
+    number_fields=['quantity', 'price', 'total_amount'],
+    reference_fields=['po_number', 'invoice_no'],
+    month_numbers=True,
+)
+
+INVENTORY_HISTORY_SEARCH = SearchSpec(
+    icontains_search(['item_code', 'supplier', 'po_product_name', 'new_product_name', 'unit', 'site_delivered',
+                      'client']),
+    number_fields=['quantity_out', 'price', 'total_amount'],
+)
+
+STOCK_IN_HISTORY_SEARCH = SearchSpec(
+    icontains_search(['item_code', 'supplier', 'particulars', 'unit', 'remarks', 'invoice_no', 'po_number']),
+    number_fields=['quantity_in'],
+    reference_fields=['po_number', 'invoice_no'],
+)
+
+# A supplier folder's stock-ins; its search box has always read 1-12 as a month
+SUPPLIER_STOCK_IN_SEARCH = SearchSpec(
+    STOCK_IN_HISTORY_SEARCH.text_search,
+    number_fields=STOCK_IN_HISTORY_SEARCH.number_fields,
+    reference_fields=STOCK_IN_HISTORY_SEARCH.reference_fields,
+    month_numbers=True,
+)
+
+
+def search_purchase_orders(queryset, query):
+    return apply_search(queryset, query, PURCHASE_ORDER_SEARCH)
+
+
+def refresh_search_text(queryset, batch_size=SEARCH_BATCH_SIZE):
+    # Recomputes search_text for rows changed without save(), e.g. by queryset.update()
+    model = queryset.model
+    batch = []
+    updated = 0
+    for instance in queryset.only('id', *PURCHASE_ORDER_SEARCH_FIELDS).iterator(chunk_size=batch_size):
+        instance.search_text = build_search_text(instance)
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, ['search_text'])
+            updated += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, ['search_text'])
+        updated += len(batch)
+    return updated
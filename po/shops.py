@@ -0,0 +1,60 @@
+from django.apps import apps
+
+
+class Shop:
+    # po and JubanShop keep the same set of inventory models; JubanShop's names just carry a "Juban" prefix.
+    # Services take a Shop so one implementation serves both.
+    def __init__(self, name, app_label, model_prefix=''):
+        self.name = name
+        self.app_label = app_label
+        self.model_prefix = model_prefix
+
+    def model(self, name):
+        return apps.get_model(self.app_label, self.model_prefix + name)
+
+    @property
+    def item_inventory(self):
+        return self.model('ItemInventory')
+
+    @property
+    def inventory_history(self):
+        return self.model('InventoryHistory')
+
+    @property
+    def stock_in_history(self):
+        return self.model('StockInHistory')
+
+    @property
+    def inventory_supplier_folder(self):
+        return self.model('InventorySupplierFolder')
+
+    @property
+    def item_code_list(self):
+        return self.model('ItemCodeList')
+
+    @property
+    def cart(self):
+        return self.model('Cart')
+
+    @property
+    def site_inventory_folder(self):
+        return self.model('SiteInventoryFolder')
+
+    @property
+    def client_inventory_folder(self):
+        return self.model('ClientInventoryFolder')
+
+    def __str__(self):
+        return self.name
+
+
+PO_SHOP = Shop('po', 'po')
+JUBAN_SHOP = Shop('juban', 'JubanShop', model_prefix='Juban')
+SHOPS = (PO_SHOP, JUBAN_SHOP)
+
+
+def get_shop(name):
+    for shop in SHOPS:
+        if shop.name == name:
+            return shop
+    raise LookupError(f'Unknown shop {name!r}')
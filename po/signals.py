@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .catalog import catalog_changed, sync_item_codes
+from .models import InventoryHistory, ItemInventory
+from .roles import roles_changed
+from .rollups import history_deleted, history_saved, history_saving
+from .shops import PO_SHOP
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=ItemInventory)
+def sync_item_code_list(sender, instance, **kwargs):
+    # Keeps the item code list in step with inventory writes (bulk writes call sync_item_codes themselves)
+    sync_item_codes(PO_SHOP, [(instance.item_code, instance.po_product_name, instance.unit)])
+
+
+@receiver(post_save, sender=ItemInventory)
+@receiver(post_delete, sender=ItemInventory)
+def inventory_catalog_changed(sender, instance, **kwargs):
+    # The cached product names and catalog feed (po/catalog.py) are rebuilt on the next read
+    catalog_changed(PO_SHOP, [instance.pk])
+
+
+# Folder totals (po/rollups.py) follow every saved or deleted history row
+
+@receiver(pre_save, sender=InventoryHistory)
+def remember_history_folders(sender, instance, using, update_fields=None, **kwargs):
+    history_saving(sender, instance, using, update_fields)
+
+
+@receiver(post_save, sender=InventoryHistory)
+def update_folder_rollups(sender, instance, using, update_fields=None, **kwargs):
+    history_saved(sender, instance, using, update_fields)
+
+
+@receiver(post_delete, sender=InventoryHistory)
+def remove_from_folder_rollups(sender, instance, using, **kwargs):
+    history_deleted(sender, instance, using)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Users added to or removed from a group re-resolve their cached role (see po/roles.py)
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        roles_changed([instance.pk])
+    else:
+        roles_changed(pk_set)  # Cleared from the group's side there is no pk_set: everyone re-resolves
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # is_superuser may have changed; login() only touches last_login
+    if update_fields is None or 'is_superuser' in update_fields:
+        roles_changed([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    roles_changed()
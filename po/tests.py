@@ -1,3 +1,165 @@
+import io
+from decimal import Decimal
+from functools import partial
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+from openpyxl import Workbook
+
+from .imports import PURCHASE_ORDER_COLUMNS, STOCK_IN_COLUMNS, coerce_frame, read_upload
+from .models import PurchaseOrder, SupplierFolder, ItemInventory, StockInHistory
+from .search import build_search_text
+
+
+def xlsx_upload(columns, rows, name='upload.xlsx'):
+    # An uploaded workbook with the columns' headers; each row is a {header: value} dict, missing cells blank
+    workbook = Workbook()
+    worksheet = workbook.active
+    headers = [header for header, _ in columns]
+    worksheet.append(headers)
+    for row in rows:
+        worksheet.append([row.get(header) for header in headers])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class PurchaseOrderUploadTests(TestCase):
+    # A blank cell next to numbers makes pandas read the whole QTY column as floats
+    QUANTITY_ROWS = [
+        {'PO NUMBER': 'PO-1', 'PARTICULAR': 'Cement', 'QTY': None},
+        {'PO NUMBER': 'PO-2', 'PARTICULAR': 'Cement', 'QTY': 5},
+    ]
+
+    def upload(self, rows):
+        response = self.client.post(reverse('upload_file'), {'file': xlsx_upload(PURCHASE_ORDER_COLUMNS, rows)})
+        return response.json()
+
+    def test_blank_quantity_is_stored_as_none(self):
+        result = self.upload(self.QUANTITY_ROWS)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['errors'], [])
+        self.assertIsNone(PurchaseOrder.objects.get(po_number='PO-1').quantity)
+
+    def test_whole_number_quantity_is_stored_as_int(self):
+        result = self.upload(self.QUANTITY_ROWS)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['errors'], [])
+        order = PurchaseOrder.objects.get(po_number='PO-2')
+        self.assertEqual(order.quantity, 5)
+        # The bulk insert writes the same search text a later save() would
+        self.assertEqual(order.search_text, build_search_text(order))
+
+    def test_invalid_cells_are_reported_and_their_rows_skipped(self):
+        result = self.upload([
+            {'PO NUMBER': 'PO-3', 'DATE': 'someday', 'QTY': 2},
+            {'PO NUMBER': 'PO-4', 'QTY': 2.5},
+            {'PO NUMBER': 'PO-5', 'PRICE': 'ten', 'SUPPLIER': 'Acme'},
+            {'PO NUMBER': 'PO-6', 'QTY': 3, 'SUPPLIER': 'Acme'},
+        ])
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['message'], '1 row(s) imported successfully. 3 row(s) were skipped.')
+        # Rows are numbered as in the spreadsheet, below the header row
+        self.assertEqual([(error['row'], error['column'], error['value']) for error in result['errors']],
+                         [(2, 'DATE', 'someday'), (3, 'QTY', '2.5'), (4, 'PRICE', 'ten')])
+        self.assertEqual(list(PurchaseOrder.objects.values_list('po_number', flat=True)), ['PO-6'])
+        self.assertEqual(PurchaseOrder.objects.get().supplier_folder, SupplierFolder.objects.get(name='Acme'))
+
+    def test_blank_cells_are_not_errors(self):
+        result = self.upload([{'PO NUMBER': 'PO-7'}])
+
+        self.assertEqual(result['errors'], [])
+        order = PurchaseOrder.objects.get(po_number='PO-7')
+        self.assertIsNone(order.date)
+        self.assertIsNone(order.price)
+        self.assertIsNone(order.supplier_folder)
+
+    def test_upload_without_valid_rows_is_an_error(self):
+        result = self.upload([{'PO NUMBER': 'PO-8', 'QTY': 'many'}])
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['message'], 'No rows were imported.')
+        self.assertEqual(len(result['errors']), 1)
+        self.assertFalse(PurchaseOrder.objects.exists())
+
+
+class StockInUploadTests(TestCase):
+    def upload(self, rows):
+        response = self.client.post(reverse('upload_stock_in_file'), {'file': xlsx_upload(STOCK_IN_COLUMNS, rows)})
+        return response.json()
+
+    def stock_in(self, particular, quantity, **cells):
+        return {'ITEM CODE': 'C-1', 'SUPPLIER': 'Acme', 'PARTICULAR': particular, 'UNIT': 'bag',
+                'QUANTITY IN': quantity, **cells}
+
+    def test_rows_for_the_same_item_are_added_to_it_once(self):
+        item = ItemInventory.objects.create(item_code='C-1', supplier='Acme', po_product_name='Cement', unit='bag',
+                                            quantity_in=Decimal('10'), quantity_out=Decimal('4'), stock=Decimal('6'))
+
+        result = self.upload([
+            self.stock_in('Cement', 3),
+            self.stock_in('Sand', 2, **{'INVOICE NO.': 'SI-9'}),
+            self.stock_in('Cement', 4.5),
+            self.stock_in('Sand', 1),
+        ])
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['message'], '4 stock-in row(s) imported: 1 item(s) restocked, 1 new item(s).')
+        item.refresh_from_db()
+        self.assertEqual((item.quantity_in, item.quantity_out, item.stock),
+                         (Decimal('17.50'), Decimal('4.00'), Decimal('13.50')))
+        # A new item is created once, with the summed quantity and the first row's details
+        sand = ItemInventory.objects.get(po_product_name='Sand')
+        self.assertEqual((sand.quantity_in, sand.stock, sand.invoice_no), (Decimal('3.00'), Decimal('3.00'), 'SI-9'))
+        self.assertEqual(StockInHistory.objects.count(), 4)
+        self.assertEqual(set(StockInHistory.objects.values_list('supplier_folder__name', flat=True)), {'Acme'})
+
+    def test_rows_with_invalid_cells_are_not_stocked(self):
+        result = self.upload([self.stock_in('Cement', 'lots'), self.stock_in('Cement', 2)])
+
+        self.assertEqual([(error['row'], error['column']) for error in result['errors']], [(2, 'QUANTITY IN')])
+        self.assertEqual(ItemInventory.objects.get(po_product_name='Cement').stock, Decimal('2.00'))
+        self.assertEqual(StockInHistory.objects.count(), 1)
+
+    def test_names_too_long_for_the_inventory_are_reported(self):
+        result = self.upload([self.stock_in('x' * 101, 1)])
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual([(error['row'], error['column']) for error in result['errors']], [(2, 'PARTICULAR')])
+        self.assertFalse(ItemInventory.objects.exists())
+
+
+class ChunkedUploadTests(TestCase):
+    def test_chunks_keep_spreadsheet_row_numbers(self):
+        rows = [{'PO NUMBER': f'PO-{number}', 'QTY': number} for number in range(5)]
+        rows[3]['QTY'] = 'three'
+        rows.insert(2, {})  # A blank spreadsheet row is skipped but still counted
+
+        chunks = list(read_upload(xlsx_upload(PURCHASE_ORDER_COLUMNS, rows), chunk_size=2))
+
+        self.assertEqual([list(chunk.index) for chunk in chunks], [[0, 1], [3, 4], [5]])
+        _, errors = coerce_frame(chunks[1], PurchaseOrder, PURCHASE_ORDER_COLUMNS)
+        self.assertEqual([(error['row'], error['value']) for error in errors], [(6, 'three')])
+
+    def test_csv_uploads_are_read_in_chunks(self):
+        upload = SimpleUploadedFile('upload.csv', 'PO NUMBER,QTY\nPO-1,1\nPO-2,2\n,\nPO-3,3\n'.encode())
+
+        chunks = list(read_upload(upload, chunk_size=2))
+
+        self.assertEqual([list(chunk['PO NUMBER']) for chunk in chunks], [['PO-1', 'PO-2'], ['PO-3']])
+        self.assertEqual(list(chunks[1].index), [3])
+
+    @mock.patch('po.imports.read_upload', partial(read_upload, chunk_size=2))
+    def test_an_item_created_in_one_chunk_and_restocked_in_the_next_counts_as_new(self):
+        rows = [{'ITEM CODE': 'C-1', 'SUPPLIER': 'Acme', 'PARTICULAR': name, 'UNIT': 'bag', 'QUANTITY IN': 1}
+                for name in ['Cement', 'Sand', 'Cement']]
+        response = self.client.post(reverse('upload_stock_in_file'), {'file': xlsx_upload(STOCK_IN_COLUMNS, rows)})
 
-# Create your tests here.
+        self.assertEqual(response.json()['message'], '3 stock-in row(s) imported: 0 item(s) restocked, 2 new item(s).')
+        self.assertEqual(ItemInventory.objects.get(po_product_name='Cement').stock, Decimal('2.00'))
+        self.assertEqual(ItemInventory.objects.count(), 2)
@@ -54,13 +54,18 @@ urlpatterns = [
     path('client-folder/export/<int:folder_id>/', views.export_client_folder_contents,
          name='export_client_folder_contents'),
     path('export-all-client-folders/', views.export_all_client_folders, name='export_all_client_folders'),
+    path('export-jobs/<int:job_id>/', views.export_job_status, name='export_job_status'),
+    path('export-jobs/<int:job_id>/download/', views.export_job_download, name='export_job_download'),
     path('bulk_edit_inventory/', views.bulk_edit_inventory, name='bulk_edit_inventory'),
+    path('bulk_edit_inventory/items/', views.bulk_inventory_items, name='bulk_inventory_items'),
     path('remove-cart-item/<int:cart_item_id>/', views.remove_cart_item, name='remove_cart_item'),
 
     path('new-records/', views.new_records_view, name='new_records'),
     path('export-transaction-history/', views.export_transaction_history_to_excel,
          name='export_transaction_history_to_excel'),
     path('bulk_edit_purchase_order/', views.bulk_edit_purchase_order, name='bulk_edit_purchase_order'),
+    path('bulk_edit_purchase_order/items/', views.purchase_order_picker_items, name='purchase_order_picker_items'),
+    path('purchase-orders/bulk-status/', views.purchase_order_bulk_status, name='purchase_order_bulk_status'),
     path('po_remove_cart_item/<int:item_id>/', views.po_remove_cart_item, name='po_remove_cart_item'),
     path('remove_all_cart_items/', views.remove_all_cart_items, name='remove_all_cart_items'),
     path('item_code_list/', views.item_code_list, name='item_code_list'),
@@ -74,7 +79,10 @@ urlpatterns = [
     path('inventory/stock-in/export/<int:folder_id>/', views.export_inventory_supplier_contents,
          name='export_inventory_supplier_contents'),
     path('get-item-details/', views.get_item_details, name='get_item_details'),
+    path('get-item-details/batch/', views.get_item_details_batch, name='get_item_details_batch'),
     path('get-item-inventory/', views.get_item_inventory, name='get_item_inventory'),
+    path('product-typeahead/', views.product_typeahead, name='product_typeahead'),
+    path('inventory/consolidated-stock/', views.consolidated_stock_view, name='consolidated_stock'),
     path('export_stock_in_transaction_history_to_excel/', views.export_stock_in_transaction_history_to_excel,
          name='export_stock_in_transaction_history_to_excel'),
     path('stock_in_transaction_history/', views.stock_in_transaction_history, name='stock_in_transaction_history'),
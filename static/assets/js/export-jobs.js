@@ -0,0 +1,50 @@
+// Export All forms queue a background job; poll its status and download the archive when it is ready
+const EXPORT_POLL_INTERVAL = 2000;
+
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('form.export-job-form').forEach(function (form) {
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+
+            fetch(form.action, {
+                method: 'POST',
+                headers: {'X-CSRFToken': form.querySelector('[name=csrfmiddlewaretoken]').value}
+            })
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        Swal.fire('Error', data.error || 'Could not start the export.', 'error');
+                        return;
+                    }
+                    Swal.fire({
+                        title: 'Preparing export...',
+                        html: 'Queued',
+                        allowOutsideClick: false,
+                        didOpen: () => Swal.showLoading()
+                    });
+                    pollExportJob(data.status_url);
+                })
+                .catch(() => Swal.fire('Error', 'Could not start the export.', 'error'));
+        });
+    });
+});
+
+function pollExportJob(statusUrl) {
+    fetch(statusUrl)
+        .then(response => response.json())
+        .then(job => {
+            if (job.status === 'done') {
+                Swal.fire('Export ready', 'Your download will start shortly.', 'success');
+                window.location.href = job.download_url;
+            } else if (job.status === 'failed') {
+                Swal.fire('Export failed', job.error || 'Something went wrong while building the archive.', 'error');
+            } else {
+                Swal.update({html: job.status === 'running'
+                        ? `Processed ${job.processed_folders} of ${job.total_folders} folders`
+                        : 'Queued'});
+                Swal.showLoading();
+                setTimeout(() => pollExportJob(statusUrl), EXPORT_POLL_INTERVAL);
+            }
+        })
+        .catch(() => setTimeout(() => pollExportJob(statusUrl), EXPORT_POLL_INTERVAL));
+}
@@ -0,0 +1,22 @@
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// Lists the skipped rows returned by the import (first 50 only)
+function errorReport(errors) {
+    if (!errors || !errors.length) {
+        return '';
+    }
+    const rows = errors.slice(0, 50).map(error =>
+        `<tr><td>${error.row}</td><td>${escapeHtml(error.column)}</td><td>${escapeHtml(error.value)}</td><td>${escapeHtml(error.message)}</td></tr>`
+    ).join('');
+    const more = errors.length > 50 ? `<p>...and ${errors.length - 50} more.</p>` : '';
+    return `<div style="max-height: 250px; overflow-y: auto; margin-top: 10px; font-size: 0.85em;">
+                <table class="table table-sm table-bordered">
+                    <thead><tr><th>Row</th><th>Column</th><th>Value</th><th>Problem</th></tr></thead>
+                    <tbody>${rows}</tbody>
+                </table>${more}
+            </div>`;
+}